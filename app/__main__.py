@@ -0,0 +1,167 @@
+import argparse
+import sys
+from datetime import datetime, timezone
+
+
+def rotate_keys(args):
+    from app.helpers.jwt_key_helper import key_ring
+    key = key_ring.rotate()
+    print(f"New signing key {key.kid} ({key.algorithm}) written to {key.path}")
+
+
+def prune_keys(args):
+    from app.helpers.jwt_key_helper import key_ring
+    for path in key_ring.prune():
+        print(f"Removed expired key {path}")
+
+
+def list_keys(args):
+    from app.helpers.jwt_key_helper import key_ring
+    signing_kid = key_ring.signing_key.kid
+    for key in key_ring.keys():
+        created = datetime.fromtimestamp(key.created_at, timezone.utc).isoformat()
+        marker = "signing" if key.kid == signing_kid else "verify-only"
+        print(f"{key.kid}\t{key.algorithm}\t{created}\t{marker}")
+
+
+def import_users(args):
+    import json
+    from app.database import SessionLocal, init_db
+    from app.helpers.redis_helper import get_redis_helper
+    from app.repositories import UserRepository
+    from app.services.user_import_service import UserImportService, ImportCheckpoint, detect_format
+
+    checkpoint_path = args.checkpoint or f"{args.file}.checkpoint"
+    checkpoint = ImportCheckpoint.load(checkpoint_path)
+    if checkpoint.line:
+        print(f"Resuming after line {checkpoint.line}", file=sys.stderr)
+
+    report = open(args.report, "a") if args.report else sys.stdout
+    init_db()
+    db = SessionLocal()
+    try:
+        with open(args.file, encoding="utf-8", newline="") as stream:
+            service = UserImportService(UserRepository(db), get_redis_helper(), args.batch_size, args.workers)
+            for entry in service.run(stream, args.format or detect_format(args.file), checkpoint, checkpoint_path):
+                if entry["status"] in ("batch", "done"):
+                    print(f"{entry['status']}: line {entry['line']}, inserted {entry['inserted']}, duplicates {entry['duplicates']}, invalid {entry['invalid']}", file=sys.stderr)
+                else:
+                    report.write(json.dumps(entry) + "\n")
+    finally:
+        db.close()
+        if report is not sys.stdout:
+            report.close()
+
+
+def sweep_sessions(args):
+    from app.helpers.redis_helper import get_redis_helper
+    from app.helpers.session_helper import SessionMaintenance
+    maintenance = SessionMaintenance(get_redis_helper())
+    result = maintenance.sweep(args.count)
+    print(f"Swept {result['indexes']} session indexes, removed {result['removed']} orphaned entries")
+    if args.purge_legacy:
+        print(f"Removed {maintenance.purge_legacy_markers(args.count)} legacy user:email_* login markers")
+
+
+def session_report(args):
+    import json
+    from app.helpers.redis_helper import get_redis_helper
+    from app.helpers.session_helper import SessionMaintenance
+    print(json.dumps(SessionMaintenance(get_redis_helper()).memory_report(args.sample, args.count), indent=2))
+
+
+def calibrate_bcrypt(args):
+    from app.config import BCRYPT_ROUNDS
+    from app.helpers.password_helper import calibrate_rounds
+    recommended, timings = calibrate_rounds(args.target_ms / 1000, args.samples, args.min_rounds, args.max_rounds)
+    for rounds, elapsed in timings:
+        markers = [label for label, hit in (("recommended", rounds == recommended), ("configured", rounds == BCRYPT_ROUNDS)) if hit]
+        print(f"rounds {rounds:2d}\t{elapsed * 1000:9.1f} ms\t{', '.join(markers)}")
+    elapsed = dict(timings)[recommended]
+    print(f"BCRYPT_ROUNDS={recommended}  # {elapsed * 1000:.0f} ms per hash, about {1 / elapsed:.1f} logins/s per hashing worker")
+
+
+def serve(args):
+    from app.server import ServeOptions, serve
+    serve(ServeOptions(
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        keepalive=args.keepalive,
+        backlog=args.backlog,
+        max_requests=args.max_requests,
+        max_requests_jitter=args.max_requests_jitter,
+        graceful_shutdown=args.graceful_shutdown,
+        access_log=args.access_log,
+    ))
+
+
+def profile_token(args):
+    import time
+    from app.config import PROFILE_HEADER, PROFILE_SECRET
+    from app.profiling import sign_profile_token
+    if not PROFILE_SECRET:
+        print("PROFILE_SECRET is not set", file=sys.stderr)
+        return 1
+    print(f"{PROFILE_HEADER}: {sign_profile_token(args.path, int(time.time()) + args.ttl, PROFILE_SECRET)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("rotate-keys", help="generate a new JWT signing key").set_defaults(func=rotate_keys)
+    commands.add_parser("prune-keys", help="delete keys past their rotation overlap").set_defaults(func=prune_keys)
+    commands.add_parser("list-keys", help="list JWT signing and verification keys").set_defaults(func=list_keys)
+
+    from app.config import USER_IMPORT_BATCH_SIZE, USER_IMPORT_HASH_WORKERS
+    importer = commands.add_parser("import-users", help="bulk import users from a JSONL or CSV file")
+    importer.add_argument("file")
+    importer.add_argument("--format", choices=("jsonl", "csv"), help="default: from the file extension")
+    importer.add_argument("--batch-size", type=int, default=USER_IMPORT_BATCH_SIZE)
+    importer.add_argument("--workers", type=int, default=USER_IMPORT_HASH_WORKERS, help="bcrypt worker processes")
+    importer.add_argument("--checkpoint", help="progress file used to resume (default: FILE.checkpoint)")
+    importer.add_argument("--report", help="append rejected rows as JSONL here (default: stdout)")
+    importer.set_defaults(func=import_users)
+
+    sweeper = commands.add_parser("sweep-sessions", help="drop session index entries whose session is gone")
+    sweeper.add_argument("--purge-legacy", action="store_true", help="also delete the old user:email_* login markers")
+    sweeper.add_argument("--count", type=int, default=1000, help="SCAN batch size")
+    sweeper.set_defaults(func=sweep_sessions)
+
+    report = commands.add_parser("session-report", help="report Redis memory used by login sessions")
+    report.add_argument("--sample", type=int, default=1000, help="keys of each kind measured with MEMORY USAGE")
+    report.add_argument("--count", type=int, default=1000, help="SCAN batch size")
+    report.set_defaults(func=session_report)
+
+    calibrate = commands.add_parser("calibrate-bcrypt", help="recommend BCRYPT_ROUNDS for a target hash time on this machine")
+    calibrate.add_argument("--target-ms", type=float, default=250, help="acceptable time for one hash")
+    calibrate.add_argument("--samples", type=int, default=3, help="hashes timed per cost; the median is used")
+    calibrate.add_argument("--min-rounds", type=int, default=4)
+    calibrate.add_argument("--max-rounds", type=int, default=20)
+    calibrate.set_defaults(func=calibrate_bcrypt)
+
+    from app import config
+    server = commands.add_parser("serve", help="run the HTTP server (uvloop and httptools when installed)")
+    server.add_argument("--host", default=config.SERVER_HOST)
+    server.add_argument("--port", type=int, default=config.SERVER_PORT)
+    server.add_argument("--workers", type=int, default=config.SERVER_WORKERS, help="worker processes (0: CPU count)")
+    server.add_argument("--keepalive", type=int, default=config.SERVER_KEEPALIVE_SECONDS, help="idle keep-alive timeout in seconds")
+    server.add_argument("--backlog", type=int, default=config.SERVER_BACKLOG, help="listen() backlog")
+    server.add_argument("--max-requests", type=int, default=config.SERVER_LIMIT_MAX_REQUESTS, help="recycle a worker after this many requests (0: never)")
+    server.add_argument("--max-requests-jitter", type=int, default=config.SERVER_LIMIT_MAX_REQUESTS_JITTER, help="random extra requests per worker")
+    server.add_argument("--graceful-shutdown", type=int, default=config.SERVER_GRACEFUL_SHUTDOWN_SECONDS, help="seconds to drain in-flight requests")
+    server.add_argument("--access-log", action=argparse.BooleanOptionalAction, default=config.SERVER_ACCESS_LOG)
+    server.set_defaults(func=serve)
+
+    profiler = commands.add_parser("profile-token", help="sign a header that profiles requests to one path")
+    profiler.add_argument("path", help="request path, e.g. /auth/me")
+    profiler.add_argument("--ttl", type=int, default=300, help="seconds the token stays valid")
+    profiler.set_defaults(func=profile_token)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,10 +4,142 @@ import os
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or (DATABASE_URL or "").replace("+pymysql", "+aiomysql", 1)
 REDIS_HOST = os.getenv("REDIS_HOST")
 REDIS_PORT = os.getenv("REDIS_PORT")
+REDIS_DB = int(os.getenv("REDIS_DB", "0"))
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "1.0"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "5.0"))
+REDIS_SOCKET_CONNECT_TIMEOUT = float(os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT", "2.0"))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))
+
+# Redis circuit breaker and the local fallback cache used while it is open
+REDIS_BREAKER_ENABLED = os.getenv("REDIS_BREAKER_ENABLED", "true").lower() == "true"
+REDIS_BREAKER_WINDOW_SECONDS = int(os.getenv("REDIS_BREAKER_WINDOW_SECONDS", "10"))
+REDIS_BREAKER_MIN_CALLS = int(os.getenv("REDIS_BREAKER_MIN_CALLS", "20"))
+REDIS_BREAKER_ERROR_RATE = float(os.getenv("REDIS_BREAKER_ERROR_RATE", "0.5"))
+REDIS_BREAKER_SLOW_CALL_SECONDS = float(os.getenv("REDIS_BREAKER_SLOW_CALL_SECONDS", "0.25"))
+REDIS_BREAKER_SLOW_CALL_RATE = float(os.getenv("REDIS_BREAKER_SLOW_CALL_RATE", "0.5"))
+REDIS_BREAKER_OPEN_SECONDS = float(os.getenv("REDIS_BREAKER_OPEN_SECONDS", "5"))
+REDIS_BREAKER_HALF_OPEN_PROBES = int(os.getenv("REDIS_BREAKER_HALF_OPEN_PROBES", "3"))
+REDIS_FALLBACK_CACHE_SIZE = int(os.getenv("REDIS_FALLBACK_CACHE_SIZE", "10000"))
+REDIS_FALLBACK_CACHE_TTL = int(os.getenv("REDIS_FALLBACK_CACHE_TTL", "60"))
+
+# Database pools (applied to the primary and every replica)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# Read replicas: comma-separated URLs; read-only lookups are spread across healthy ones
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+ASYNC_DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("ASYNC_DATABASE_REPLICA_URLS", "").split(",") if url.strip()] or [
+    url.replace("+pymysql", "+aiomysql", 1) for url in DATABASE_REPLICA_URLS
+]
+DB_REPLICA_HEALTH_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_HEALTH_CHECK_INTERVAL", "5"))
+DB_REPLICA_HEALTH_CHECK_TIMEOUT = float(os.getenv("DB_REPLICA_HEALTH_CHECK_TIMEOUT", "1"))
+
+# Connections opened during startup, before the app reports ready
+DB_PREWARM_CONNECTIONS = int(os.getenv("DB_PREWARM_CONNECTIONS", "5"))
+REDIS_PREWARM_CONNECTIONS = int(os.getenv("REDIS_PREWARM_CONNECTIONS", "5"))
 
 # JWT Configuration
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-super-secret-jwt-key")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 JWT_EXPIRATION_HOURS = int(os.getenv("JWT_EXPIRATION_HOURS", "24"))
+JWT_ACCESS_TOKEN_EXPIRATION_MINUTES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRATION_MINUTES", "15"))
+REFRESH_TOKEN_EXPIRATION_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRATION_DAYS", "30"))
+JWT_TOKEN_CACHE_SIZE = int(os.getenv("JWT_TOKEN_CACHE_SIZE", "10000"))
+JWT_INTROSPECT_MAX_BATCH = int(os.getenv("JWT_INTROSPECT_MAX_BATCH", "100"))
+JWT_INTROSPECT_API_TOKEN = os.getenv("JWT_INTROSPECT_API_TOKEN")
+
+# Asymmetric signing (RS256 / ES256 / EdDSA) keys, one PEM per kid
+JWT_KEYS_DIR = os.getenv("JWT_KEYS_DIR", "keys")
+JWT_KEY_ROTATION_OVERLAP_HOURS = float(os.getenv("JWT_KEY_ROTATION_OVERLAP_HOURS", str(JWT_EXPIRATION_HOURS)))
+JWT_KEYS_RELOAD_SECONDS = int(os.getenv("JWT_KEYS_RELOAD_SECONDS", "60"))
+JWKS_CACHE_MAX_AGE = int(os.getenv("JWKS_CACHE_MAX_AGE", "300"))
+
+# Password hashing worker pool
+PASSWORD_HASH_BACKEND = os.getenv("PASSWORD_HASH_BACKEND", "thread")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+PASSWORD_HASH_QUEUE_TIMEOUT_MS = int(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT_MS", "1000"))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_REHASH_ON_LOGIN = os.getenv("PASSWORD_REHASH_ON_LOGIN", "true").lower() == "true"
+
+# Rate limiting (token buckets in Redis, requests per RATE_LIMIT_WINDOW_SECONDS)
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_WINDOW_SECONDS = int(os.getenv("RATE_LIMIT_WINDOW_SECONDS", "60"))
+RATE_LIMIT_LOGIN_PER_IP = int(os.getenv("RATE_LIMIT_LOGIN_PER_IP", "30"))
+RATE_LIMIT_LOGIN_PER_EMAIL = int(os.getenv("RATE_LIMIT_LOGIN_PER_EMAIL", "5"))
+RATE_LIMIT_OTP_PER_IP = int(os.getenv("RATE_LIMIT_OTP_PER_IP", "30"))
+RATE_LIMIT_OTP_PER_USER = int(os.getenv("RATE_LIMIT_OTP_PER_USER", "5"))
+RATE_LIMIT_TRUST_FORWARDED_FOR = os.getenv("RATE_LIMIT_TRUST_FORWARDED_FOR", "false").lower() == "true"
+
+# TOTP secret cache (in-process LRU in front of Redis)
+OTP_SECRET_CACHE_SIZE = int(os.getenv("OTP_SECRET_CACHE_SIZE", "10000"))
+OTP_SECRET_LOCAL_TTL = int(os.getenv("OTP_SECRET_LOCAL_TTL", "30"))
+OTP_SECRET_REDIS_TTL = int(os.getenv("OTP_SECRET_REDIS_TTL", "3600"))
+OTP_SECRET_TOMBSTONE_TTL = int(os.getenv("OTP_SECRET_TOMBSTONE_TTL", "60"))
+OTP_BATCH_MAX_SIZE = int(os.getenv("OTP_BATCH_MAX_SIZE", "500"))
+
+# Read-through user cache (in-process LRU in front of Redis)
+USER_CACHE_ENABLED = os.getenv("USER_CACHE_ENABLED", "true").lower() == "true"
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_LOCAL_TTL = int(os.getenv("USER_CACHE_LOCAL_TTL", "30"))
+USER_CACHE_REDIS_TTL = int(os.getenv("USER_CACHE_REDIS_TTL", "900"))
+USER_CACHE_NEGATIVE_TTL = int(os.getenv("USER_CACHE_NEGATIVE_TTL", "30"))
+USER_CACHE_TOMBSTONE_TTL = int(os.getenv("USER_CACHE_TOMBSTONE_TTL", "60"))
+
+# HTTP server (python -m app serve)
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "0"))
+SERVER_KEEPALIVE_SECONDS = int(os.getenv("SERVER_KEEPALIVE_SECONDS", "5"))
+SERVER_BACKLOG = int(os.getenv("SERVER_BACKLOG", "2048"))
+SERVER_LIMIT_MAX_REQUESTS = int(os.getenv("SERVER_LIMIT_MAX_REQUESTS", "0"))
+SERVER_LIMIT_MAX_REQUESTS_JITTER = int(os.getenv("SERVER_LIMIT_MAX_REQUESTS_JITTER", "0"))
+SERVER_GRACEFUL_SHUTDOWN_SECONDS = int(os.getenv("SERVER_GRACEFUL_SHUTDOWN_SECONDS", "20"))
+SERVER_ACCESS_LOG = os.getenv("SERVER_ACCESS_LOG", "true").lower() == "true"
+
+# Logging (JSON lines on stderr, written by a background thread)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_SAMPLE_BURST = int(os.getenv("LOG_SAMPLE_BURST", "5"))
+LOG_SAMPLE_WINDOW_SECONDS = float(os.getenv("LOG_SAMPLE_WINDOW_SECONDS", "10"))
+REQUEST_ID_HEADER = os.getenv("REQUEST_ID_HEADER", "X-Request-ID")
+
+# Metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Admin API: bulk import, user listing and export
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN")
+USER_IMPORT_BATCH_SIZE = int(os.getenv("USER_IMPORT_BATCH_SIZE", "1000"))
+USER_IMPORT_HASH_WORKERS = int(os.getenv("USER_IMPORT_HASH_WORKERS", str(os.cpu_count() or 1)))
+# POST /admin/users/import shares the CPUs with logins, so it gets a small share
+USER_IMPORT_API_HASH_WORKERS = int(os.getenv("USER_IMPORT_API_HASH_WORKERS", str(max(1, (os.cpu_count() or 1) // 4))))
+USER_IMPORT_API_MAX_CONCURRENT = int(os.getenv("USER_IMPORT_API_MAX_CONCURRENT", "1"))
+USER_LIST_MAX_LIMIT = int(os.getenv("USER_LIST_MAX_LIMIT", "100"))
+USER_EXPORT_BATCH_SIZE = int(os.getenv("USER_EXPORT_BATCH_SIZE", "1000"))
+
+# Login sessions (Redis hash per session, sorted-set index per user)
+SESSION_COOKIE_NAME = os.getenv("SESSION_COOKIE_NAME", "session_id")
+SESSION_COOKIE_SECURE = os.getenv("SESSION_COOKIE_SECURE", "true").lower() == "true"
+SESSION_IDLE_TTL_SECONDS = int(os.getenv("SESSION_IDLE_TTL_SECONDS", "86400"))
+SESSION_MAX_AGE_SECONDS = int(os.getenv("SESSION_MAX_AGE_SECONDS", "2592000"))
+SESSION_TOUCH_INTERVAL_SECONDS = int(os.getenv("SESSION_TOUCH_INTERVAL_SECONDS", "300"))
+SESSION_MAX_PER_USER = int(os.getenv("SESSION_MAX_PER_USER", "20"))
+
+# Per-request profiling (off unless PROFILE_SECRET or PROFILE_SAMPLE_RATE is set)
+PROFILE_SECRET = os.getenv("PROFILE_SECRET")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_HEADER = os.getenv("PROFILE_HEADER", "X-Profile-Token")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "2"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "30"))
+PROFILE_MAX_CONCURRENT = int(os.getenv("PROFILE_MAX_CONCURRENT", "1"))
+PROFILE_MAX_SPANS = int(os.getenv("PROFILE_MAX_SPANS", "10000"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_DIR_MAX_BYTES = int(os.getenv("PROFILE_DIR_MAX_BYTES", str(100 * 1024 * 1024)))
@@ -1,16 +1,280 @@
-from sqlalchemy import create_engine
+import asyncio
+import functools
+import inspect
+import itertools
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from app import DATABASE_URL
+from sqlalchemy.orm import Session, sessionmaker
+from app import config
+from app.metrics import registry, instrument_engine
+
+logger = logging.getLogger(__name__)
+
+# Engines are built on first use (normally by the lifespan hook), not at import,
+# so importing models, CLI commands or tools never opens a pool.
+_engine: Optional[Engine] = None
+_async_engine: Optional[AsyncEngine] = None
+_lock = threading.Lock()
+
+db_reads = registry.counter("db_reads_total", "Read-only repository queries by where they were sent", ("target",))
+
+
+@dataclass
+class Replica:
+    name: str
+    engine: Engine
+    async_engine: AsyncEngine
+    healthy: bool = True
+
+
+class ReplicaSet:
+    def __init__(self):
+        self.replicas: list[Replica] = []
+        self._next = itertools.count()
+
+    def pick(self) -> Optional[Replica]:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._next) % len(healthy)]
+
+    def mark_down(self, replica: Replica, error: Exception):
+        if replica.healthy:
+            logger.warning("DB replica marked down", extra={"replica": replica.name, "error": repr(error)})
+        replica.healthy = False
+
+    async def check(self, timeout: float):
+        for replica in self.replicas:
+            try:
+                async with replica.async_engine.connect() as conn:
+                    await asyncio.wait_for(conn.execute(text("SELECT 1")), timeout)
+                if not replica.healthy:
+                    logger.info("DB replica recovered", extra={"replica": replica.name})
+                replica.healthy = True
+            except Exception as e:
+                self.mark_down(replica, e)
+
+    async def run_health_checks(self, interval: float, timeout: float):
+        while True:
+            await asyncio.sleep(interval)
+            await self.check(timeout)
+
+
+replicas = ReplicaSet()
+
+
+@registry.register_collector
+def collect_replicas():
+    yield "db_replica_healthy", "gauge", "1 while a read replica passes health checks", [
+        ("db_replica_healthy", {"replica": replica.name}, int(replica.healthy)) for replica in replicas.replicas
+    ]
+
+
+class RoutingSession(Session):
+    # Statements run on the primary unless the session is inside a @read_only
+    # repository method, in which case they go to a healthy replica, if any.
+    use_async_engines = False
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.info.get("read_only") and not self._flushing:
+            replica = replicas.pick()
+            if replica is not None:
+                db_reads.inc("replica")
+                self.info["replica"] = replica
+                return replica.async_engine.sync_engine if self.use_async_engines else replica.engine
+            db_reads.inc("primary")
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+class AsyncRoutingSession(RoutingSession):
+    use_async_engines = True
+
+
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False)
+AsyncSessionLocal = async_sessionmaker(class_=AsyncSession, sync_session_class=AsyncRoutingSession, autoflush=False, expire_on_commit=False)
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+
+def _pool_options() -> dict:
+    return dict(
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,
+        pool_pre_ping=config.DB_POOL_PRE_PING,
+    )
+
+
+def init_db():
+    global _engine, _async_engine
+    if _async_engine is not None:
+        return
+    with _lock:
+        if _async_engine is not None:
+            return
+        _engine = create_engine(config.DATABASE_URL, **_pool_options())
+        async_engine = create_async_engine(config.ASYNC_DATABASE_URL, **_pool_options())
+        instrument_engine(_engine, "sync")
+        instrument_engine(async_engine.sync_engine, "async")
+        SessionLocal.configure(bind=_engine)
+        AsyncSessionLocal.configure(bind=async_engine)
+
+        for index, (url, async_url) in enumerate(zip(config.DATABASE_REPLICA_URLS, config.ASYNC_DATABASE_REPLICA_URLS)):
+            replica = Replica(f"replica{index}", create_engine(url, **_pool_options()), create_async_engine(async_url, **_pool_options()))
+            instrument_engine(replica.engine, f"{replica.name}_sync")
+            instrument_engine(replica.async_engine.sync_engine, f"{replica.name}_async")
+            replicas.replicas.append(replica)
+        _async_engine = async_engine
+
+
+def get_engine() -> Engine:
+    init_db()
+    return _engine
+
+
+def get_async_engine() -> AsyncEngine:
+    init_db()
+    return _async_engine
+
+
+def _is_connection_error(error: DBAPIError) -> bool:
+    return error.connection_invalidated or error.orig is None or type(error.orig).__name__ in ("OperationalError", "InterfaceError")
+
+
+def read_only(func):
+    # Marks a repository method (sync or async; it must use `self.db`) as safe to
+    # serve from a replica. A replica connection error marks it down and retries
+    # on the primary. A None result is re-read on the primary too, so replica lag
+    # never turns a just-written row into a 404 or a cached miss. A row found on a
+    # replica may still be stale, so callers that cache results check
+    # read_from_replica() first. Do not use it for reads that guard a write, such
+    # as uniqueness checks.
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            info = self.db.info
+            if info.get("read_only"):
+                return await func(self, *args, **kwargs)
+            info["replica_read"] = False
+            if not replicas.replicas:
+                return await func(self, *args, **kwargs)
+            info["read_only"] = True
+            try:
+                result = await func(self, *args, **kwargs)
+                if result is not None or "replica" not in info:
+                    info["replica_read"] = "replica" in info
+                    return result
+            except DBAPIError as e:
+                if "replica" not in info or not _is_connection_error(e):
+                    raise
+                replicas.mark_down(info["replica"], e)
+                await self.db.rollback()
+            finally:
+                info["read_only"] = False
+                info.pop("replica", None)
+            db_reads.inc("primary_retry")
+            return await func(self, *args, **kwargs)
+        return wrapper
+
+    @functools.wraps(func)
+    def sync_wrapper(self, *args, **kwargs):
+        info = self.db.info
+        if info.get("read_only"):
+            return func(self, *args, **kwargs)
+        info["replica_read"] = False
+        if not replicas.replicas:
+            return func(self, *args, **kwargs)
+        info["read_only"] = True
+        try:
+            result = func(self, *args, **kwargs)
+            if result is not None or "replica" not in info:
+                info["replica_read"] = "replica" in info
+                return result
+        except DBAPIError as e:
+            if "replica" not in info or not _is_connection_error(e):
+                raise
+            replicas.mark_down(info["replica"], e)
+            self.db.rollback()
+        finally:
+            info["read_only"] = False
+            info.pop("replica", None)
+        db_reads.inc("primary_retry")
+        return func(self, *args, **kwargs)
+    return sync_wrapper
+
+
+def read_from_replica(db) -> bool:
+    # Whether the last @read_only call on this session was answered by a replica.
+    return db.info.get("replica_read", False)
+
+
+async def _prewarm_engine(async_engine: AsyncEngine, connections: int):
+    count = min(connections, async_engine.pool.size()) if hasattr(async_engine.pool, "size") else connections
+    if count <= 0:
+        return
+    conns = await asyncio.gather(*(async_engine.connect() for _ in range(count)))
+    try:
+        for conn in conns:
+            await conn.execute(text("SELECT 1"))
+    finally:
+        for conn in conns:
+            await conn.close()
+
+
+async def prewarm_db(connections: int) -> float:
+    # Open up to `connections` pooled connections per async engine concurrently and
+    # return them, so the first requests after startup skip connect and handshake.
+    # A replica that cannot be reached starts out marked down.
+    started = time.perf_counter()
+    await _prewarm_engine(get_async_engine(), connections)
+    for replica in replicas.replicas:
+        try:
+            await _prewarm_engine(replica.async_engine, connections)
+        except Exception as e:
+            replicas.mark_down(replica, e)
+    return time.perf_counter() - started
+
+
+async def dispose_db():
+    # dispose() only drops the pools; the engines stay usable and reconnect lazily.
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _engine.dispose()
+    for replica in replicas.replicas:
+        await replica.async_engine.dispose()
+        replica.engine.dispose()
+
+
+def __getattr__(name: str):
+    # Keeps `from app.database import engine, async_engine` working; the engines
+    # are created on that first access instead of when the module is imported.
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 # Dependency to get DB session
 def get_db():
+    init_db()
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Dependency to get async DB session
+async def get_async_db():
+    init_db()
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1 +1,2 @@
-from .redis_helper import *
\ No newline at end of file
+from .redis_helper import *
+from .password_helper import *
\ No newline at end of file
@@ -1,7 +1,9 @@
-from fastapi import Depends, HTTPException, status
+import hmac
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.helpers.jwt_helper import JWTHelper, get_jwt_helper
-from typing import Dict, Any
+from app.config import JWT_INTROSPECT_API_TOKEN
+from typing import Dict, Any, Optional
 
 security = HTTPBearer()
 
@@ -33,4 +35,11 @@ async def get_current_user_id(
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token payload"
-        )
\ No newline at end of file
+        )
+
+
+def require_introspection_client(x_introspect_token: Optional[str] = Header(None)):
+    # Open when no token is configured: introspection only reveals claims that the
+    # token's holder can already decode.
+    if JWT_INTROSPECT_API_TOKEN and (not x_introspect_token or not hmac.compare_digest(x_introspect_token, JWT_INTROSPECT_API_TOKEN)):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid introspection token")
@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+from fastapi import HTTPException, status
+from app.metrics import registry
+
+MISSING = object()
+
+
+# Raised when a write has committed but its cache entries could not be dropped: the
+# client retries instead of the stale entry being served for its whole TTL.
+def invalidation_failed() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Cache invalidation failed, please retry")
+
+
+class LRUCache:
+    def __init__(self, max_size: int, ttl: Optional[float] = None, name: Optional[str] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[Any, Optional[float]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if name:
+            named_caches[name] = self
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, MISSING)
+            if entry is MISSING:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float] = None):
+        if self.max_size <= 0:
+            return
+        if expires_at is None and self.ttl is not None:
+            expires_at = time.time() + self.ttl
+
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._data.pop(key, MISSING) is not MISSING
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+named_caches: dict[str, LRUCache] = {}
+
+
+@registry.register_collector
+def collect_caches():
+    stats = {name: cache.stats() for name, cache in named_caches.items()}
+    for field, kind, documentation in (
+        ("hits", "counter", "In-process cache hits"),
+        ("misses", "counter", "In-process cache misses"),
+        ("evictions", "counter", "In-process cache evictions"),
+        ("size", "gauge", "Entries in the in-process cache"),
+    ):
+        name = f"cache_{field}_total" if kind == "counter" else f"cache_{field}"
+        yield name, kind, documentation, [(name, {"cache": cache}, values[field]) for cache, values in stats.items()]
@@ -0,0 +1,169 @@
+import logging
+import threading
+import time
+from typing import Callable, Optional
+from app.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATES = (CLOSED, OPEN, HALF_OPEN)
+
+# A permit is (state, generation) at the time the call was let through, so an
+# outcome that arrives after the breaker has moved on is not counted twice.
+Permit = tuple[str, int]
+
+
+class CircuitBreaker:
+    # Closed: calls go through and outcomes land in one-second buckets. Once the
+    # window holds at least min_calls, an error rate or slow-call rate at or above
+    # its threshold opens the breaker. Open: calls are rejected without touching the
+    # backend for open_seconds. Half-open: up to half_open_probes calls are let
+    # through; all of them succeeding quickly closes the breaker, any failure or
+    # slow call reopens it.
+    def __init__(
+        self,
+        name: str,
+        window_seconds: int = 10,
+        min_calls: int = 20,
+        error_rate: float = 0.5,
+        slow_call_seconds: float = 0.25,
+        slow_call_rate: float = 0.5,
+        open_seconds: float = 5.0,
+        half_open_probes: int = 3,
+        enabled: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.window_seconds = max(1, window_seconds)
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = max(1, half_open_probes)
+        self.enabled = enabled
+        self.clock = clock
+        self._lock = threading.Lock()
+        # Each bucket is [second, calls, failures, slow calls].
+        self._buckets = [[0, 0, 0, 0] for _ in range(self.window_seconds)]
+        self.state = CLOSED
+        self.generation = 0
+        self.opened_at = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+        self.rejected = 0
+        self.transitions = {state: 0 for state in STATES}
+        breakers[name] = self
+
+    def _transition(self, state: str):
+        self.state = state
+        self.generation += 1
+        self.transitions[state] += 1
+        self._probes = self._probe_successes = 0
+        if state == OPEN:
+            self.opened_at = self.clock()
+        elif state == CLOSED:
+            for bucket in self._buckets:
+                bucket[:] = [0, 0, 0, 0]
+        logger.warning("Circuit breaker state changed", extra={"breaker": self.name, "state": state})
+
+    # bypass: the caller goes ahead when refused, so the refusal is not counted as
+    # a rejection; its outcome is not recorded either, as it holds no permit.
+    def acquire(self, bypass: bool = False) -> Optional[Permit]:
+        if not self.enabled:
+            return CLOSED, -1
+        with self._lock:
+            if self.state == CLOSED:
+                return CLOSED, self.generation
+            if self.state == OPEN:
+                if self.clock() - self.opened_at < self.open_seconds:
+                    self.rejected += not bypass
+                    return None
+                self._transition(HALF_OPEN)
+            if self._probes >= self.half_open_probes:
+                self.rejected += not bypass
+                return None
+            self._probes += 1
+            return HALF_OPEN, self.generation
+
+    def record(self, permit: Permit, elapsed: float, failed: bool):
+        state, generation = permit
+        slow = elapsed >= self.slow_call_seconds
+        with self._lock:
+            if generation != self.generation:
+                return
+            if state == HALF_OPEN:
+                self._probes -= 1
+                if failed or slow:
+                    self._transition(OPEN)
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_probes:
+                    self._transition(CLOSED)
+                return
+
+            now = int(self.clock())
+            bucket = self._buckets[now % self.window_seconds]
+            if bucket[0] != now:
+                bucket[:] = [now, 0, 0, 0]
+            bucket[1] += 1
+            bucket[2] += failed
+            bucket[3] += slow
+            # Only a bad outcome can trip the breaker, so successes skip the sums.
+            if failed or slow:
+                calls, failures, slow_calls = self._totals(now)
+                if calls >= self.min_calls and (failures / calls >= self.error_rate or slow_calls / calls >= self.slow_call_rate):
+                    self._transition(OPEN)
+
+    def _totals(self, now: int) -> tuple[int, int, int]:
+        calls = failures = slow_calls = 0
+        for second, bucket_calls, bucket_failures, bucket_slow in self._buckets:
+            if now - second < self.window_seconds:
+                calls += bucket_calls
+                failures += bucket_failures
+                slow_calls += bucket_slow
+        return calls, failures, slow_calls
+
+    def reset(self):
+        with self._lock:
+            if self.state != CLOSED:
+                self._transition(CLOSED)
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls, failures, slow_calls = self._totals(int(self.clock()))
+            return {
+                "state": self.state,
+                "window_calls": calls,
+                "window_failures": failures,
+                "window_slow_calls": slow_calls,
+                "rejected": self.rejected,
+                "transitions": dict(self.transitions),
+            }
+
+
+breakers: dict[str, CircuitBreaker] = {}
+
+
+@registry.register_collector
+def collect_breakers():
+    stats = {name: breaker.stats() for name, breaker in breakers.items()}
+    yield "circuit_breaker_state", "gauge", "1 for the state each circuit breaker is in", [
+        ("circuit_breaker_state", {"breaker": name, "state": state}, int(values["state"] == state))
+        for name, values in stats.items() for state in STATES
+    ]
+    yield "circuit_breaker_transitions_total", "counter", "Circuit breaker state changes by new state", [
+        ("circuit_breaker_transitions_total", {"breaker": name, "state": state}, count)
+        for name, values in stats.items() for state, count in values["transitions"].items()
+    ]
+    yield "circuit_breaker_rejected_total", "counter", "Calls rejected without reaching the backend", [
+        ("circuit_breaker_rejected_total", {"breaker": name}, values["rejected"]) for name, values in stats.items()
+    ]
+    yield "circuit_breaker_window_calls", "gauge", "Calls in the current error-rate window by outcome", [
+        ("circuit_breaker_window_calls", {"breaker": name, "outcome": outcome}, values[f"window_{field}"])
+        for name, values in stats.items()
+        for outcome, field in (("total", "calls"), ("failed", "failures"), ("slow", "slow_calls"))
+    ]
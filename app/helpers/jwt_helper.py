@@ -1,7 +1,13 @@
 import jwt
+import hashlib
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict, Any
-from app.config import JWT_SECRET_KEY, JWT_ALGORITHM, JWT_EXPIRATION_HOURS
+from typing import Optional, Dict, Any, List
+from app.config import JWT_SECRET_KEY, JWT_ALGORITHM, JWT_EXPIRATION_HOURS, JWT_ACCESS_TOKEN_EXPIRATION_MINUTES, JWT_TOKEN_CACHE_SIZE
+from app.helpers.cache_helper import LRUCache
+from app.helpers.jwt_key_helper import key_ring, is_asymmetric
+
+# Verified claims keyed by sha256(token); each entry expires at the token's own exp.
+token_cache = LRUCache(JWT_TOKEN_CACHE_SIZE, name="jwt_token")
 
 
 class JWTHelper:
@@ -16,19 +22,56 @@ class JWTHelper:
             expire = datetime.now(timezone.utc) + timedelta(hours=JWT_EXPIRATION_HOURS)
         
         to_encode.update({"exp": expire, "iat": datetime.now(timezone.utc)})
-        
+
+        if is_asymmetric(JWT_ALGORITHM):
+            signing_key = key_ring.signing_key
+            return jwt.encode(to_encode, signing_key.private_key, algorithm=JWT_ALGORITHM, headers={"kid": signing_key.kid})
+
         encoded_jwt = jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
         return encoded_jwt
     
     @staticmethod
     def verify_token(token: str) -> Optional[Dict[str, Any]]:
+        if is_asymmetric(JWT_ALGORITHM):
+            # Retiring a key flushes the cache, so check for a key change before trusting it.
+            key_ring.maybe_reload()
+
+        cache_key = hashlib.sha256(token.encode('utf-8')).digest()
+        payload = token_cache.get(cache_key)
+        if payload is not None:
+            return dict(payload)
+
         try:
-            payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-            return payload
+            if is_asymmetric(JWT_ALGORITHM):
+                key = key_ring.verification_key(jwt.get_unverified_header(token).get("kid"))
+                if key is None:
+                    return None
+            else:
+                key = JWT_SECRET_KEY
+            payload = jwt.decode(token, key, algorithms=[JWT_ALGORITHM])
         except jwt.ExpiredSignatureError:
             return None
-        except jwt.JWTError:
+        except jwt.InvalidTokenError:
             return None
+
+        if "exp" in payload:
+            token_cache.set(cache_key, payload, expires_at=payload["exp"])
+        return dict(payload)
+
+    @staticmethod
+    def introspect_tokens(tokens: List[str]) -> List[Optional[Dict[str, Any]]]:
+        # Duplicate tokens in a batch are verified once; verify_token's cache is
+        # shared with bearer authentication, so tokens already seen cost a lookup.
+        verified = {token: JWTHelper.verify_token(token) for token in dict.fromkeys(tokens)}
+        return [verified[token] for token in tokens]
+
+    @staticmethod
+    def flush_token_cache():
+        token_cache.clear()
+
+    @staticmethod
+    def token_cache_stats() -> Dict[str, Any]:
+        return token_cache.stats()
     
     @staticmethod
     def create_user_token(user_id: int, email: str, username: str) -> str:
@@ -39,7 +82,7 @@ class JWTHelper:
             "type": "access_token"
         }
         
-        return JWTHelper.create_access_token(payload)
+        return JWTHelper.create_access_token(payload, timedelta(minutes=JWT_ACCESS_TOKEN_EXPIRATION_MINUTES))
     
     @staticmethod
     def get_user_from_token(token: str) -> Optional[Dict[str, str]]:
@@ -53,5 +96,8 @@ class JWTHelper:
         return None
 
 
+key_ring.on_change.append(JWTHelper.flush_token_cache)
+
+
 def get_jwt_helper() -> JWTHelper:
     return JWTHelper()
\ No newline at end of file
@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from jwt.algorithms import get_default_algorithms
+from app.config import (
+    JWT_ALGORITHM,
+    JWT_KEYS_DIR,
+    JWT_KEY_ROTATION_OVERLAP_HOURS,
+    JWT_KEYS_RELOAD_SECONDS,
+)
+
+_KID_PATTERN = re.compile(r"^(\d+)-[0-9a-f]+$")
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    kid: str
+    algorithm: str
+    private_key: Any
+    public_key: Any
+    created_at: float
+    path: str
+
+
+def is_asymmetric(algorithm: str) -> bool:
+    return not algorithm.startswith("HS")
+
+
+def generate_private_key(algorithm: str):
+    if algorithm.startswith(("RS", "PS")):
+        return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    if algorithm == "ES256":
+        return ec.generate_private_key(ec.SECP256R1())
+    if algorithm == "ES384":
+        return ec.generate_private_key(ec.SECP384R1())
+    if algorithm == "EdDSA":
+        return ed25519.Ed25519PrivateKey.generate()
+    raise ValueError(f"Unsupported signing algorithm: {algorithm}")
+
+
+class KeyRing:
+    def __init__(self, keys_dir: str, algorithm: str, overlap_seconds: float, reload_seconds: float):
+        self.keys_dir = keys_dir
+        self.algorithm = algorithm
+        self.overlap_seconds = overlap_seconds
+        self.reload_seconds = reload_seconds
+        self._lock = threading.Lock()
+        self._keys: dict[str, SigningKey] = {}
+        self._signing_key: Optional[SigningKey] = None
+        self._fingerprint: Optional[tuple] = None
+        self._checked_at = 0.0
+        self._next_expiry = float("inf")
+        self.jwks_body = b""
+        self.jwks_etag = ""
+        self.on_change = []
+        self._publish([])
+
+    @property
+    def signing_key(self) -> SigningKey:
+        self.maybe_reload()
+        if self._signing_key is None:
+            self.rotate()
+        return self._signing_key
+
+    def verification_key(self, kid: Optional[str]) -> Optional[Any]:
+        self.maybe_reload()
+        key = self._keys.get(kid)
+        if key is None and time.monotonic() - self._checked_at >= 1.0:
+            # Another worker may have rotated; rescan, at most once per second.
+            self.maybe_reload(force=True)
+            key = self._keys.get(kid)
+        return key.public_key if key else None
+
+    def maybe_reload(self, force: bool = False):
+        now = time.monotonic()
+        expired = time.time() >= self._next_expiry
+        if not force and not expired and self._fingerprint is not None and now - self._checked_at < self.reload_seconds:
+            return
+        with self._lock:
+            self._checked_at = now
+            fingerprint = self._scan_fingerprint()
+            if expired or fingerprint != self._fingerprint:
+                self._load()
+                self._fingerprint = fingerprint
+
+    def rotate(self) -> SigningKey:
+        os.makedirs(self.keys_dir, mode=0o700, exist_ok=True)
+        kid = f"{time.time_ns() // 1_000_000}-{secrets.token_hex(4)}"
+        pem = generate_private_key(self.algorithm).private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption(),
+        )
+        path = os.path.join(self.keys_dir, f"{kid}.pem")
+        with open(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "wb") as f:
+            f.write(pem)
+        self.maybe_reload(force=True)
+        return self._keys[kid]
+
+    def prune(self) -> list[str]:
+        self.maybe_reload(force=True)
+        expired = self._expired_paths()
+        for path in expired:
+            os.remove(path)
+        if expired:
+            self.maybe_reload(force=True)
+        return expired
+
+    def keys(self) -> list[SigningKey]:
+        self.maybe_reload()
+        return sorted(self._keys.values(), key=lambda key: key.created_at)
+
+    def _scan_fingerprint(self) -> tuple:
+        if not os.path.isdir(self.keys_dir):
+            return ()
+        return tuple(sorted(
+            (entry.name, entry.stat().st_mtime_ns)
+            for entry in os.scandir(self.keys_dir)
+            if entry.name.endswith(".pem")
+        ))
+
+    def _read_all(self) -> list[SigningKey]:
+        if not os.path.isdir(self.keys_dir):
+            return []
+        loaded = []
+        for entry in os.scandir(self.keys_dir):
+            if not entry.name.endswith(".pem"):
+                continue
+            kid = entry.name[:-4]
+            with open(entry.path, "rb") as f:
+                private_key = serialization.load_pem_private_key(f.read(), password=None)
+            match = _KID_PATTERN.match(kid)
+            created_at = int(match.group(1)) / 1000 if match else entry.stat().st_mtime
+            loaded.append(SigningKey(kid, self.algorithm, private_key, private_key.public_key(), created_at, entry.path))
+        return sorted(loaded, key=lambda key: key.created_at)
+
+    def _expired_paths(self) -> list[str]:
+        now = time.time()
+        ordered = self._read_all()
+        return [
+            key.path for key, successor in zip(ordered, ordered[1:])
+            if successor.created_at + self.overlap_seconds < now
+        ]
+
+    def _load(self):
+        now = time.time()
+        ordered = self._read_all()
+        # A key stays valid for verification until `overlap` after its successor
+        # took over signing, so tokens minted just before a rotation keep working.
+        retire_at = [successor.created_at + self.overlap_seconds for successor in ordered[1:]] + [float("inf")]
+        active = [key for key, until in zip(ordered, retire_at) if until >= now]
+        previous = set(self._keys)
+        self._keys = {key.kid: key for key in active}
+        self._signing_key = ordered[-1] if ordered else None
+        self._next_expiry = min(until for until in retire_at if until >= now)
+        self._publish(active)
+
+        if previous and previous != set(self._keys):
+            for callback in self.on_change:
+                callback()
+
+    def _publish(self, active: list[SigningKey]):
+        jwks = {"keys": []}
+        for key in active:
+            jwk = get_default_algorithms()[self.algorithm].to_jwk(key.public_key, as_dict=True)
+            jwk.update({"kid": key.kid, "alg": self.algorithm, "use": "sig"})
+            jwks["keys"].append(jwk)
+        self.jwks_body = json.dumps(jwks, separators=(",", ":")).encode("utf-8")
+        self.jwks_etag = '"' + hashlib.sha256(self.jwks_body).hexdigest()[:32] + '"'
+
+
+key_ring = KeyRing(
+    keys_dir=JWT_KEYS_DIR,
+    algorithm=JWT_ALGORITHM,
+    overlap_seconds=JWT_KEY_ROTATION_OVERLAP_HOURS * 3600,
+    reload_seconds=JWT_KEYS_RELOAD_SECONDS,
+)
@@ -0,0 +1,68 @@
+from typing import Optional
+from fastapi import Depends
+from pyotp import TOTP
+from app.config import OTP_SECRET_CACHE_SIZE, OTP_SECRET_LOCAL_TTL, OTP_SECRET_REDIS_TTL, OTP_SECRET_TOMBSTONE_TTL
+from app.helpers.cache_helper import LRUCache, invalidation_failed
+from app.helpers.redis_helper import AsyncRedisHelper, get_async_redis_helper
+
+KEY_PREFIX = "otp_secret:"
+# Written by invalidate in place of the secret. set() only fills a missing key, so
+# a verify that read the old secret before the delete cannot cache it again.
+TOMBSTONE = ""
+
+# Local tier holds ready-to-use TOTP objects. It is per worker, so its TTL bounds how
+# long another worker can keep verifying against a key that was deleted elsewhere.
+otp_totp_cache = LRUCache(OTP_SECRET_CACHE_SIZE, ttl=OTP_SECRET_LOCAL_TTL, name="otp_secret")
+
+
+class OtpSecretCache:
+    def __init__(
+        self,
+        redis_helper: AsyncRedisHelper,
+        local_cache: LRUCache = otp_totp_cache,
+        redis_ttl: int = OTP_SECRET_REDIS_TTL,
+        tombstone_ttl: int = OTP_SECRET_TOMBSTONE_TTL,
+    ):
+        self.redis_helper = redis_helper
+        self.local_cache = local_cache
+        self.redis_ttl = redis_ttl
+        self.tombstone_ttl = tombstone_ttl
+
+    async def get(self, user_id: int) -> Optional[TOTP]:
+        totp = self.local_cache.get(user_id)
+        if totp is not None:
+            return totp
+
+        secret = await self.redis_helper.get(f"{KEY_PREFIX}{user_id}")
+        if not secret:
+            return None
+
+        totp = TOTP(secret)
+        self.local_cache.set(user_id, totp)
+        return totp
+
+    # Caches a secret read from the database, unless the key was invalidated (or
+    # cached by someone else) since; the returned TOTP is usable either way.
+    async def set(self, user_id: int, secret: str) -> TOTP:
+        totp = TOTP(secret)
+        if await self.redis_helper.compare_and_set(f"{KEY_PREFIX}{user_id}", None, secret, ex=self.redis_ttl):
+            self.local_cache.set(user_id, totp)
+        return totp
+
+    # After a delete the cached secret must not outlive the key, so a failed write
+    # raises 503.
+    async def invalidate(self, user_id: int):
+        self.local_cache.delete(user_id)
+        if not await self.redis_helper.set(f"{KEY_PREFIX}{user_id}", TOMBSTONE, ex=self.tombstone_ttl, bypass_breaker=True):
+            raise invalidation_failed()
+
+    # For a newly created key. A user without a key has nothing cached in Redis but
+    # possibly a tombstone, which must stay; only this worker's local entry can be
+    # stale (other workers' expire after OTP_SECRET_LOCAL_TTL).
+    def created(self, *user_ids: int):
+        for user_id in user_ids:
+            self.local_cache.delete(user_id)
+
+
+async def get_otp_secret_cache(redis_helper: AsyncRedisHelper = Depends(get_async_redis_helper)) -> OtpSecretCache:
+    return OtpSecretCache(redis_helper)
@@ -0,0 +1,21 @@
+import base64
+import binascii
+import json
+from typing import Optional
+from fastapi import HTTPException, status
+
+
+# Cursors are opaque to clients: base64 of the last key seen, so the encoding can
+# change (e.g. to a composite sort key) without breaking the API.
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"id": last_id}).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    if not cursor:
+        return None
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return int(data["id"])
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
@@ -0,0 +1,253 @@
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+from bcrypt import hashpw, gensalt, checkpw
+from fastapi import HTTPException, status
+from app.config import (
+    PASSWORD_HASH_BACKEND,
+    PASSWORD_HASH_WORKERS,
+    PASSWORD_HASH_MAX_QUEUE,
+    PASSWORD_HASH_QUEUE_TIMEOUT_MS,
+    BCRYPT_ROUNDS,
+)
+from app.metrics import registry
+
+HASH_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class PasswordHashQueueTimeout(Exception):
+    pass
+
+
+def hash_password(password: bytes, rounds: int = BCRYPT_ROUNDS) -> str:
+    return hashpw(password, gensalt(rounds)).decode('utf-8')
+
+
+# Worker functions are module level so they can be pickled for the process backend.
+# Both check the queue-time budget before doing any bcrypt work, so a request that
+# already waited too long is dropped without burning CPU.
+def _hash_password(password: bytes, submitted_at: float, queue_timeout: float, rounds: int = BCRYPT_ROUNDS) -> tuple[str, float]:
+    if queue_timeout and time.time() - submitted_at > queue_timeout:
+        raise PasswordHashQueueTimeout()
+    started = time.perf_counter()
+    hashed = hash_password(password, rounds)
+    return hashed, time.perf_counter() - started
+
+
+def _check_password(password: bytes, hashed: bytes, submitted_at: float, queue_timeout: float) -> tuple[bool, float]:
+    if queue_timeout and time.time() - submitted_at > queue_timeout:
+        raise PasswordHashQueueTimeout()
+    started = time.perf_counter()
+    valid = checkpw(password, hashed)
+    return valid, time.perf_counter() - started
+
+
+def hash_rounds(hashed: str) -> Optional[int]:
+    # "$2b$12$<salt><digest>": the cost is the second field.
+    parts = hashed.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def measure_rounds(rounds: int, samples: int = 3) -> float:
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        hashpw(b"calibration-password", gensalt(rounds))
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def calibrate_rounds(target_seconds: float, samples: int = 3, min_rounds: int = 4, max_rounds: int = 20) -> tuple[int, list[tuple[int, float]]]:
+    # Each extra round doubles the work, so stop once one hash takes twice the target.
+    timings = []
+    for rounds in range(min_rounds, max_rounds + 1):
+        elapsed = measure_rounds(rounds, samples)
+        timings.append((rounds, elapsed))
+        if elapsed > target_seconds * 2:
+            break
+    within = [rounds for rounds, elapsed in timings if elapsed <= target_seconds]
+    return (max(within) if within else min_rounds), timings
+
+
+class PasswordHasherMetrics:
+    def __init__(self, buckets: tuple[float, ...] = HASH_LATENCY_BUCKETS):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.rehashed = 0
+        self.rehash_failed = 0
+        self.rehash_skipped = 0
+        self.latency_sum = 0.0
+
+    def submitted(self):
+        with self._lock:
+            self.pending += 1
+
+    def finished(self, latency: Optional[float] = None, timed_out: bool = False):
+        with self._lock:
+            self.pending -= 1
+            if timed_out:
+                self.timed_out += 1
+            if latency is None:
+                return
+            self.completed += 1
+            self.latency_sum += latency
+            for index, bound in enumerate(self.buckets):
+                if latency <= bound:
+                    self.bucket_counts[index] += 1
+                    break
+            else:
+                self.bucket_counts[-1] += 1
+
+    def reject(self):
+        with self._lock:
+            self.rejected += 1
+
+    def rehash(self, succeeded: bool):
+        with self._lock:
+            if succeeded:
+                self.rehashed += 1
+            else:
+                self.rehash_failed += 1
+
+    def skip_rehash(self):
+        with self._lock:
+            self.rehash_skipped += 1
+
+    def snapshot(self, workers: int) -> dict:
+        with self._lock:
+            return {
+                "workers": workers,
+                "in_flight": self.pending,
+                "queue_depth": max(0, self.pending - workers),
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "rehashed": self.rehashed,
+                "rehash_failed": self.rehash_failed,
+                "rehash_skipped": self.rehash_skipped,
+                "latency_sum": self.latency_sum,
+                "latency_buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.bucket_counts)),
+            }
+
+
+class PasswordHasher:
+    def __init__(self, backend: str = "thread", workers: int = 4, max_queue: int = 64, queue_timeout_ms: int = 1000, rounds: int = BCRYPT_ROUNDS):
+        if backend not in ("thread", "process"):
+            raise ValueError(f"Unknown password hash backend: {backend}")
+        self.backend = backend
+        self.rounds = rounds
+        self.workers = workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout_ms / 1000
+        self.metrics = PasswordHasherMetrics()
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.backend == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def hash(self, password: str) -> str:
+        hashed, _ = await self._submit(_hash_password, password.encode('utf-8'), rounds=self.rounds)
+        return hashed
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        valid, _ = await self._submit(_check_password, password.encode('utf-8'), hashed.encode('utf-8'))
+        return valid
+
+    def needs_rehash(self, hashed: str) -> bool:
+        return hash_rounds(hashed) != self.rounds
+
+    # True while a job would start at once instead of queueing behind others.
+    def has_idle_worker(self) -> bool:
+        return self.metrics.pending < self.workers
+
+    def stats(self) -> dict:
+        return self.metrics.snapshot(self.workers)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+    async def _submit(self, func, *args, **kwargs):
+        if self.metrics.pending >= self.workers + self.max_queue:
+            self.metrics.reject()
+            raise self._busy()
+
+        self.metrics.submitted()
+        future = self.executor.submit(func, *args, time.time(), self.queue_timeout, **kwargs)
+        future.add_done_callback(self._record)
+        try:
+            return await asyncio.wrap_future(future)
+        except PasswordHashQueueTimeout:
+            raise self._busy()
+
+    def _record(self, future: Future):
+        if future.cancelled():
+            self.metrics.finished()
+        elif isinstance(future.exception(), PasswordHashQueueTimeout):
+            self.metrics.finished(timed_out=True)
+        elif future.exception() is not None:
+            self.metrics.finished()
+        else:
+            self.metrics.finished(future.result()[1])
+
+    def _busy(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Password hashing is busy, please retry",
+            headers={"Retry-After": "1"},
+        )
+
+
+password_hasher = PasswordHasher(
+    backend=PASSWORD_HASH_BACKEND,
+    workers=PASSWORD_HASH_WORKERS,
+    max_queue=PASSWORD_HASH_MAX_QUEUE,
+    queue_timeout_ms=PASSWORD_HASH_QUEUE_TIMEOUT_MS,
+    rounds=BCRYPT_ROUNDS,
+)
+
+
+@registry.register_collector
+def collect_password_hasher():
+    stats = password_hasher.stats()
+    yield "password_hash_in_flight", "gauge", "bcrypt jobs queued or running", [("password_hash_in_flight", {}, stats["in_flight"])]
+    yield "password_hash_queue_depth", "gauge", "bcrypt jobs waiting for a worker", [("password_hash_queue_depth", {}, stats["queue_depth"])]
+    yield "password_hash_rejected_total", "counter", "bcrypt jobs rejected because the queue was full", [("password_hash_rejected_total", {}, stats["rejected"])]
+    yield "password_hash_timed_out_total", "counter", "bcrypt jobs dropped after waiting too long", [("password_hash_timed_out_total", {}, stats["timed_out"])]
+    yield "password_rehash_total", "counter", "Stored hashes upgraded to BCRYPT_ROUNDS after a login", [
+        ("password_rehash_total", {"outcome": "ok"}, stats["rehashed"]),
+        ("password_rehash_total", {"outcome": "failed"}, stats["rehash_failed"]),
+        ("password_rehash_total", {"outcome": "skipped"}, stats["rehash_skipped"]),
+    ]
+    samples, cumulative = [], 0
+    for bound, count in stats["latency_buckets"].items():
+        cumulative += count
+        samples.append(("password_hash_duration_seconds_bucket", {"le": bound}, cumulative))
+    samples.append(("password_hash_duration_seconds_sum", {}, stats["latency_sum"]))
+    samples.append(("password_hash_duration_seconds_count", {}, stats["completed"]))
+    yield "password_hash_duration_seconds", "histogram", "bcrypt time on the worker", samples
+
+
+def get_password_hasher() -> PasswordHasher:
+    return password_hasher
@@ -0,0 +1,160 @@
+import math
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Optional
+from fastapi import Depends, HTTPException, Request, status
+from app.config import (
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_WINDOW_SECONDS,
+    RATE_LIMIT_LOGIN_PER_IP,
+    RATE_LIMIT_LOGIN_PER_EMAIL,
+    RATE_LIMIT_OTP_PER_IP,
+    RATE_LIMIT_OTP_PER_USER,
+    RATE_LIMIT_TRUST_FORWARDED_FOR,
+)
+from app.helpers.redis_helper import AsyncRedisHelper, get_async_redis_helper
+from app.metrics import registry
+
+KEY_PREFIX = "rate_limit:"
+
+# Token bucket over every key in KEYS, checked and consumed atomically.
+# ARGV holds (capacity, window_ms) pairs, one per key. Nothing is consumed unless
+# every bucket has a token. Returns {allowed, retry_after_ms, remaining}.
+TOKEN_BUCKET_SCRIPT = """
+    local time = redis.call('TIME')
+    local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+    local tokens = {}
+    local retry_after = 0
+    local remaining = -1
+    for i = 1, #KEYS do
+        local capacity = tonumber(ARGV[2 * i - 1])
+        local rate = capacity / tonumber(ARGV[2 * i])
+        local state = redis.call('HMGET', KEYS[i], 't', 'ts')
+        local available = tonumber(state[1]) or capacity
+        local updated = tonumber(state[2]) or now
+        available = math.min(capacity, available + math.max(0, now - updated) * rate)
+        if available < 1 then
+            retry_after = math.max(retry_after, math.ceil((1 - available) / rate))
+        end
+        tokens[i] = available
+        if remaining < 0 or available - 1 < remaining then
+            remaining = available - 1
+        end
+    end
+    if retry_after > 0 then
+        return {0, retry_after, 0}
+    end
+    for i = 1, #KEYS do
+        redis.call('HSET', KEYS[i], 't', tostring(tokens[i] - 1), 'ts', now)
+        redis.call('PEXPIRE', KEYS[i], ARGV[2 * i])
+    end
+    return {1, 0, math.floor(remaining)}
+"""
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    dimension: str
+    requests: int
+    window_seconds: int = RATE_LIMIT_WINDOW_SECONDS
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    retry_after: int = 0
+    remaining: Optional[int] = None
+
+
+LOGIN_LIMITS = (RateLimit("ip", RATE_LIMIT_LOGIN_PER_IP), RateLimit("email", RATE_LIMIT_LOGIN_PER_EMAIL))
+OTP_VERIFY_LIMITS = (RateLimit("ip", RATE_LIMIT_OTP_PER_IP), RateLimit("user_id", RATE_LIMIT_OTP_PER_USER))
+
+
+class RateLimitCounters:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.allowed = defaultdict(int)
+        self.rejected = defaultdict(int)
+        self.errors = defaultdict(int)
+
+    def record(self, name: str, result: Optional[RateLimitResult]):
+        with self._lock:
+            if result is None:
+                self.errors[name] += 1
+            elif result.allowed:
+                self.allowed[name] += 1
+            else:
+                self.rejected[name] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            names = set(self.allowed) | set(self.rejected) | set(self.errors)
+            return {
+                name: {"allowed": self.allowed[name], "rejected": self.rejected[name], "errors": self.errors[name]}
+                for name in sorted(names)
+            }
+
+
+rate_limit_counters = RateLimitCounters()
+
+
+@registry.register_collector
+def collect_rate_limits():
+    samples = [
+        ("rate_limit_decisions_total", {"limit": name, "outcome": outcome}, count)
+        for name, outcomes in rate_limit_counters.snapshot().items()
+        for outcome, count in outcomes.items()
+    ]
+    yield "rate_limit_decisions_total", "counter", "Rate limit checks by outcome", samples
+
+
+def client_ip(request: Request) -> str:
+    if RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+class RateLimiter:
+    def __init__(self, redis_helper: AsyncRedisHelper, enabled: bool = RATE_LIMIT_ENABLED):
+        self.redis_helper = redis_helper
+        self.enabled = enabled
+        if "token_bucket" not in redis_helper.scripts:
+            redis_helper.register_script("token_bucket", TOKEN_BUCKET_SCRIPT)
+
+    async def check(self, name: str, limits: tuple[RateLimit, ...], **values) -> Optional[RateLimitResult]:
+        keys, args = [], []
+        for limit in limits:
+            value = values.get(limit.dimension)
+            if value is None or limit.requests <= 0:
+                continue
+            keys.append(f"{KEY_PREFIX}{name}:{limit.dimension}:{str(value).lower()}")
+            args.extend([limit.requests, limit.window_seconds * 1000])
+        if not keys:
+            return RateLimitResult(allowed=True)
+
+        reply = await self.redis_helper.run_script("token_bucket", keys=keys, args=args)
+        if reply is None:
+            return None
+        return RateLimitResult(allowed=reply[0] == 1, retry_after=math.ceil(reply[1] / 1000), remaining=reply[2])
+
+    async def enforce(self, name: str, limits: tuple[RateLimit, ...], **values):
+        if not self.enabled:
+            return
+        result = await self.check(name, limits, **values)
+        rate_limit_counters.record(name, result)
+
+        # Fail open: an unavailable Redis must not lock everyone out.
+        if result is None or result.allowed:
+            return
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests, please retry later",
+            headers={"Retry-After": str(max(1, result.retry_after))},
+        )
+
+
+async def get_rate_limiter(redis_helper: AsyncRedisHelper = Depends(get_async_redis_helper)) -> RateLimiter:
+    return RateLimiter(redis_helper)
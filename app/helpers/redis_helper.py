@@ -1,146 +1,595 @@
 import redis
+import redis.asyncio as aioredis
 import json
-from typing import Optional
-from fastapi import Depends
-from app import get_redis
+import logging
+import time
+from contextlib import contextmanager, asynccontextmanager
+from typing import Optional, Union, Callable, Iterator, AsyncIterator
+from app.redis import get_redis, get_async_redis
+from app.metrics import registry, redis_command_duration, redis_command_errors, request_profile
+from app.helpers.cache_helper import LRUCache
+from app.helpers.circuit_breaker import CircuitBreaker, Permit
+from app.config import (
+    REDIS_BREAKER_ENABLED,
+    REDIS_BREAKER_WINDOW_SECONDS,
+    REDIS_BREAKER_MIN_CALLS,
+    REDIS_BREAKER_ERROR_RATE,
+    REDIS_BREAKER_SLOW_CALL_SECONDS,
+    REDIS_BREAKER_SLOW_CALL_RATE,
+    REDIS_BREAKER_OPEN_SECONDS,
+    REDIS_BREAKER_HALF_OPEN_PROBES,
+    REDIS_FALLBACK_CACHE_SIZE,
+    REDIS_FALLBACK_CACHE_TTL,
+)
 
-class RedisHelper:
-    def __init__(self, redis: redis.Redis):
-        self.redis = redis
+logger = logging.getLogger(__name__)
 
-    def set(self, key: str, value: any, ex: Optional[int] = None) -> bool:
-        try:
-            if isinstance(value, (dict, list)):
-                value = json.dumps(value)
+# Returned by a read when Redis could not answer (an error, or the breaker is open)
+# and the fallback cache had nothing. Pass it as `default` to tell that apart from
+# a miss, which is None.
+UNAVAILABLE = object()
 
-            self.redis.set(key, value, ex=ex)
+# Shared by the sync and async helpers: they talk to the same server.
+redis_breaker = CircuitBreaker(
+    "redis",
+    window_seconds=REDIS_BREAKER_WINDOW_SECONDS,
+    min_calls=REDIS_BREAKER_MIN_CALLS,
+    error_rate=REDIS_BREAKER_ERROR_RATE,
+    slow_call_seconds=REDIS_BREAKER_SLOW_CALL_SECONDS,
+    slow_call_rate=REDIS_BREAKER_SLOW_CALL_RATE,
+    open_seconds=REDIS_BREAKER_OPEN_SECONDS,
+    half_open_probes=REDIS_BREAKER_HALF_OPEN_PROBES,
+    enabled=REDIS_BREAKER_ENABLED,
+)
 
-            return True
-        except Exception as e:
-            print(f"Redis Set Error: {e}")
-            return False
+# Last value read with get/mget, per key. It is only served when Redis cannot
+# answer, and writes through the helper drop the local copy first, so a worker
+# never falls back to a value older than its own last write.
+redis_fallback_cache = LRUCache(REDIS_FALLBACK_CACHE_SIZE, ttl=REDIS_FALLBACK_CACHE_TTL, name="redis_fallback")
+
+LUA_SCRIPTS = {
+    # INCRBY and set the TTL only when the key is created, in one round trip.
+    "incr_with_ttl": """
+        local value = redis.call('INCRBY', KEYS[1], ARGV[1])
+        if value == tonumber(ARGV[1]) then
+            redis.call('EXPIRE', KEYS[1], ARGV[2])
+        end
+        return value
+    """,
+    # Set KEYS[1] to ARGV[2] only if it currently holds ARGV[1] (or is missing when ARGV[4] == 1).
+    "compare_and_set": """
+        local current = redis.call('GET', KEYS[1])
+        if (ARGV[4] == '1' and current) or (ARGV[4] ~= '1' and current ~= ARGV[1]) then
+            return 0
+        end
+        if tonumber(ARGV[3]) > 0 then
+            redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+        else
+            redis.call('SET', KEYS[1], ARGV[2])
+        end
+        return 1
+    """,
+    "compare_and_delete": """
+        if redis.call('GET', KEYS[1]) == ARGV[1] then
+            return redis.call('DEL', KEYS[1])
+        end
+        return 0
+    """,
+}
+
+
+def _encode(value: any) -> any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def _positive(result: int) -> bool:
+    return result > 0
+
+
+def _one(result: int) -> bool:
+    return result == 1
+
+
+def _true(result: any) -> bool:
+    return True
+
+
+def _remember(cache: LRUCache, key: str, value: any, default: any) -> any:
+    # A read refreshes the fallback copy and a miss drops it; when Redis could not
+    # answer, the copy is served instead, or `default` if there is none.
+    if value is UNAVAILABLE:
+        return cache.get(key, default)
+    if value is None:
+        cache.delete(key)
+    else:
+        cache.set(key, value)
+    return value
+
+
+def _forget(cache: LRUCache, keys) -> None:
+    for key in keys:
+        cache.delete(key)
+
+
+def _start(command: str) -> tuple[float, any]:
+    profile = request_profile.get()
+    return time.perf_counter(), profile.begin("redis", command) if profile is not None else None
+
+
+def _finish(breaker: CircuitBreaker, permit: Optional[Permit], command: str, started: float, span: any, failed: bool):
+    elapsed = time.perf_counter() - started
+    # A call that bypassed an open breaker has no permit and does not count.
+    if permit is not None:
+        breaker.record(permit, elapsed, failed)
+    if span is not None:
+        span.end(error=failed)
+    if registry.enabled:
+        redis_command_duration.observe(elapsed, command)
+
+
+class RedisPipeline:
+    def __init__(
+        self,
+        pipeline: redis.client.Pipeline,
+        scripts: dict,
+        breaker: CircuitBreaker = redis_breaker,
+        fallback_cache: LRUCache = redis_fallback_cache,
+        bypass_breaker: bool = False,
+    ):
+        self.pipeline = pipeline
+        self.scripts = scripts
+        self.breaker = breaker
+        self.fallback_cache = fallback_cache
+        self.bypass_breaker = bypass_breaker
+        self.callbacks: list[Optional[Callable]] = []
+        self.results: list = []
+        self.failed = False
+
+    def _queue(self, callback: Optional[Callable], command: str, *args, **kwargs) -> "RedisPipeline":
+        getattr(self.pipeline, command)(*args, **kwargs)
+        self.callbacks.append(callback)
+        return self
+
+    def set(self, key: str, value: any, ex: Optional[int] = None) -> "RedisPipeline":
+        self.fallback_cache.delete(key)
+        return self._queue(bool, "set", key, _encode(value), ex=ex)
+
+    def get(self, key: str) -> "RedisPipeline":
+        return self._queue(None, "get", key)
+
+    def mget(self, keys: list[str]) -> "RedisPipeline":
+        return self._queue(None, "mget", keys)
+
+    def delete(self, key: str) -> "RedisPipeline":
+        self.fallback_cache.delete(key)
+        return self._queue(_positive, "delete", key)
+
+    def exists(self, key: str) -> "RedisPipeline":
+        return self._queue(_positive, "exists", key)
+
+    def expire(self, key: str, seconds: int) -> "RedisPipeline":
+        return self._queue(bool, "expire", key, seconds)
+
+    def incr(self, key: str, amount: int = 1) -> "RedisPipeline":
+        self.fallback_cache.delete(key)
+        return self._queue(None, "incrby", key, amount)
+
+    def hset(self, name: str, key: Optional[str] = None, value: Optional[str] = None, mapping: Optional[dict[str, any]] = None) -> "RedisPipeline":
+        return self._queue(_positive, "hset", name, key, value, mapping=mapping)
+
+    def hget(self, name: str, key: str) -> "RedisPipeline":
+        return self._queue(None, "hget", name, key)
+
+    def hmget(self, name: str, keys: list[str]) -> "RedisPipeline":
+        return self._queue(None, "hmget", name, keys)
+
+    def hgetall(self, name: str) -> "RedisPipeline":
+        return self._queue(None, "hgetall", name)
+
+    def hdel(self, name: str, key: str) -> "RedisPipeline":
+        return self._queue(_positive, "hdel", name, key)
+
+    def zadd(self, name: str, mapping: dict[str, float]) -> "RedisPipeline":
+        return self._queue(_positive, "zadd", name, mapping)
+
+    def zrange(self, name: str, start: int, end: int, withscores: bool = False) -> "RedisPipeline":
+        return self._queue(None, "zrange", name, start, end, withscores=withscores)
 
-    def get(self, key: str) -> Optional[str]:
+    def zremove(self, name: str, member: str) -> "RedisPipeline":
+        return self._queue(_positive, "zrem", name, member)
+
+    def publish(self, channel: str, message: str) -> "RedisPipeline":
+        return self._queue(None, "publish", channel, message)
+
+    def run_script(self, name: str, keys: list[str], args: Optional[list] = None) -> "RedisPipeline":
+        script = self.scripts[name]
+        self.pipeline.scripts.add(script)
+        return self._queue(None, "evalsha", script.sha, len(keys), *keys, *(args or []))
+
+    def _apply_callbacks(self, results: list) -> list:
+        self.results = [
+            callback(result) if callback and not isinstance(result, Exception) else result
+            for callback, result in zip(self.callbacks, results)
+        ]
+        return self.results
+
+    def _failed(self, e: Optional[Exception] = None) -> list:
+        if e is not None:
+            redis_command_errors.inc("pipeline")
+            logger.warning("Redis pipeline failed", extra={"command": "pipeline", "error": repr(e)})
+        self.failed = True
+        self.results = [None] * len(self.callbacks)
+        return self.results
+
+    def execute(self) -> list:
+        permit = self.breaker.acquire(self.bypass_breaker)
+        if permit is None and not self.bypass_breaker:
+            return self._failed()
+        started, span = _start("pipeline")
+        failed = True
         try:
-            value = self.redis.get(key)
-            if value is None:
-                return None
-            
-            return value
+            results = self.pipeline.execute()
+            failed = False
+            return self._apply_callbacks(results)
         except Exception as e:
-            print(f"Redis Get Error: {e}")
-            return None
+            return self._failed(e)
+        finally:
+            _finish(self.breaker, permit, "pipeline", started, span, failed)
 
-    def delete(self, key: str) -> bool:
+    def reset(self):
+        self.pipeline.reset()
+
+
+class AsyncRedisPipeline(RedisPipeline):
+    async def execute(self) -> list:
+        permit = self.breaker.acquire(self.bypass_breaker)
+        if permit is None and not self.bypass_breaker:
+            return self._failed()
+        started, span = _start("pipeline")
+        failed = True
         try:
-            return self.redis.delete(key) > 0
+            results = await self.pipeline.execute()
+            failed = False
+            return self._apply_callbacks(results)
         except Exception as e:
-            print(f"Redis Delete Error: {e}")
-            return False
+            return self._failed(e)
+        finally:
+            _finish(self.breaker, permit, "pipeline", started, span, failed)
 
-    def exists(self, key: str) -> bool:
+    async def reset(self):
+        await self.pipeline.reset()
+
+
+class RedisHelper:
+    def __init__(self, redis: redis.Redis, breaker: CircuitBreaker = redis_breaker, fallback_cache: LRUCache = redis_fallback_cache):
+        self.redis = redis
+        self.breaker = breaker
+        self.fallback_cache = fallback_cache
+        self.scripts = {}
+        for name, source in LUA_SCRIPTS.items():
+            self.register_script(name, source)
+
+    # Every command goes through here: one place for timing, error counting, the
+    # circuit breaker and the fall-back value returned when Redis is unavailable.
+    # While the breaker is open, commands return `default` without a round trip,
+    # except with bypass_breaker: cache invalidations must reach Redis even when it
+    # is only slow, or stale entries are served again once the breaker closes.
+    def _call(self, command: str, func: Callable, default: any = None, transform: Optional[Callable] = None, bypass_breaker: bool = False) -> any:
+        permit = self.breaker.acquire(bypass_breaker)
+        if permit is None and not bypass_breaker:
+            return default
+        started, span = _start(command)
+        failed = True
         try:
-            return self.redis.exists(key) > 0
+            result = func()
+            failed = False
+            return transform(result) if transform else result
         except Exception as e:
-            print(f"Redis Exists Error: {e}")
-            return False
+            redis_command_errors.inc(command)
+            logger.warning("Redis command failed", extra={"command": command, "error": repr(e)})
+            return default
+        finally:
+            _finish(self.breaker, permit, command, started, span, failed)
+
+    def set(self, key: str, value: any, ex: Optional[int] = None, bypass_breaker: bool = False) -> bool:
+        self.fallback_cache.delete(key)
+        return self._call("set", lambda: self.redis.set(key, _encode(value), ex=ex), False, _true, bypass_breaker)
+
+    def get(self, key: str, default: any = None) -> Optional[str]:
+        return _remember(self.fallback_cache, key, self._call("get", lambda: self.redis.get(key), UNAVAILABLE), default)
+
+    def delete(self, key: str) -> bool:
+        self.fallback_cache.delete(key)
+        return self._call("delete", lambda: self.redis.delete(key), False, _positive)
+
+    def exists(self, key: str) -> bool:
+        return self._call("exists", lambda: self.redis.exists(key), False, _positive)
 
     def expire(self, key: str, seconds: int) -> bool:
-        try:
-            return self.redis.expire(key, seconds)
-        except Exception as e:
-            print(f"Redis Expire Error: {e}")
-            return False
+        return self._call("expire", lambda: self.redis.expire(key, seconds), False)
+
+    def mget(self, keys: list[str], default: any = None) -> list[Optional[str]]:
+        values = self._call("mget", lambda: self.redis.mget(keys), UNAVAILABLE)
+        if values is UNAVAILABLE:
+            values = [UNAVAILABLE] * len(keys)
+        return [_remember(self.fallback_cache, key, value, default) for key, value in zip(keys, values)]
+
+    def mset(self, mapping: dict[str, any], ex: Optional[Union[int, dict[str, int]]] = None) -> bool:
+        _forget(self.fallback_cache, mapping)
+        def mset():
+            if ex is None:
+                return self.redis.mset({key: _encode(value) for key, value in mapping.items()})
+
+            pipe = self.redis.pipeline(transaction=False)
+            for key, value in mapping.items():
+                pipe.set(key, _encode(value), ex=ex.get(key) if isinstance(ex, dict) else ex)
+            return all(pipe.execute())
+
+        return self._call("mset", mset, False)
+
+    def incr_with_ttl(self, key: str, seconds: int, amount: int = 1) -> int:
+        self.fallback_cache.delete(key)
+        return self._call("incr_with_ttl", lambda: self.scripts["incr_with_ttl"](keys=[key], args=[amount, seconds]), -1)
+
+    def compare_and_set(self, key: str, expected: Optional[str], value: any, ex: Optional[int] = None) -> bool:
+        args = ["" if expected is None else expected, _encode(value), ex or 0, int(expected is None)]
+        self.fallback_cache.delete(key)
+        return self._call("compare_and_set", lambda: self.scripts["compare_and_set"](keys=[key], args=args), False, _one)
+
+    def compare_and_delete(self, key: str, expected: str) -> bool:
+        self.fallback_cache.delete(key)
+        return self._call("compare_and_delete", lambda: self.scripts["compare_and_delete"](keys=[key], args=[expected]), False, _one)
 
     ### list ###
 
     def lpush(self, key: str, *values) -> int:
-        try:
-            return self.redis.lpush(key, *values)
-        except Exception as e:
-            print(f"Redis LPush Error: {e}")
-            return -1
+        return self._call("lpush", lambda: self.redis.lpush(key, *values), -1)
 
     def rpush(self, key: str, *values) -> int:
-        try:
-            return self.redis.rpush(key, *values)
-        except Exception as e:
-            print(f"Redis RPush Error: {e}")
-            return -1
+        return self._call("rpush", lambda: self.redis.rpush(key, *values), -1)
 
     def lpop(self, key: str) -> Optional[str]:
-        try:
-            return self.redis.lpop(key)
-        except Exception as e:
-            print(f"Redis LPop Error: {e}")
-            return None
+        return self._call("lpop", lambda: self.redis.lpop(key))
 
     def rpop(self, key: str) -> Optional[str]:
-        try:
-            return self.redis.rpop(key)
-        except Exception as e:
-            print(f"Redis RPop Error: {e}")
-            return None
+        return self._call("rpop", lambda: self.redis.rpop(key))
 
     def lrange(self, key: str, start: int, end: int) -> list[str]:
-        try:
-            return self.redis.lrange(key, start, end)
-        except Exception as e:
-            print(f"Redis LRange Error: {e}")
-            return []
+        return self._call("lrange", lambda: self.redis.lrange(key, start, end), [])
         
     ### hash map ###
 
-    def hset(self, name: str, key: str, value: str) -> bool:
-        try:
-            return self.redis.hset(name, key, value) > 0
-        except Exception as e:
-            print(f"Redis HSet Error: {e}")
-            return False
+    def hset(self, name: str, key: Optional[str] = None, value: Optional[str] = None, mapping: Optional[dict[str, any]] = None) -> bool:
+        return self._call("hset", lambda: self.redis.hset(name, key, value, mapping=mapping), False, _positive)
 
     def hget(self, name: str, key: str) -> Optional[str]:
-        try:
-            return self.redis.hget(name, key)
-        except Exception as e:
-            print(f"Redis HGet Error: {e}")
-            return None
+        return self._call("hget", lambda: self.redis.hget(name, key))
+
+    def hmget(self, name: str, keys: list[str]) -> list[Optional[str]]:
+        return self._call("hmget", lambda: self.redis.hmget(name, keys), [None] * len(keys))
 
     def hdel(self, name: str, key: str) -> bool:
-        try:
-            return self.redis.hdel(name, key) > 0
-        except Exception as e:
-            print(f"Redis HDel Error: {e}")
-            return False
+        return self._call("hdel", lambda: self.redis.hdel(name, key), False, _positive)
 
     def hgetall(self, name: str) -> dict[str, str]:
-        try:
-            return self.redis.hgetall(name)
-        except Exception as e:
-            print(f"Redis HGetAll Error: {e}")
-            return {}
+        return self._call("hgetall", lambda: self.redis.hgetall(name), {})
         
     ### Sorted Set (ZSet) ###
     
     def zadd(self, name: str, mapping: dict[str, float]) -> bool:
-        try:
-            return self.redis.zadd(name, mapping) > 0
-        except Exception as e:
-            print(f"Redis ZAdd Error: {e}")
-            return False
+        return self._call("zadd", lambda: self.redis.zadd(name, mapping), False, _positive)
 
-    def zrange(self, name: str, start: int, end: int, withscores: bool = False) -> list[tuple[str, float]]:
-        try:
-            return self.redis.zrange(name, start, end, withscores=withscores)
-        except Exception as e:
-            print(f"Redis ZRange Error: {e}")
-            return []
+    def zrange(self, name: str, start: int, end: int, withscores: bool = False, default: any = None) -> list[tuple[str, float]]:
+        return self._call("zrange", lambda: self.redis.zrange(name, start, end, withscores=withscores), [] if default is None else default)
 
     def zremove(self, name: str, member: str) -> bool:
+        return self._call("zrem", lambda: self.redis.zrem(name, member), False, _positive)
+
+    ### keyspace ###
+
+    def scan(self, cursor: int = 0, match: Optional[str] = None, count: int = 1000) -> tuple[int, list[str]]:
+        return self._call("scan", lambda: self.redis.scan(cursor, match=match, count=count), (0, []))
+
+    def unlink(self, keys: list[str]) -> int:
+        _forget(self.fallback_cache, keys)
+        return self._call("unlink", lambda: self.redis.unlink(*keys), 0) if keys else 0
+
+    def memory_usage(self, key: str) -> Optional[int]:
+        return self._call("memory_usage", lambda: self.redis.memory_usage(key, samples=0))
+
+    def object_encoding(self, key: str) -> Optional[str]:
+        return self._call("object_encoding", lambda: self.redis.object("ENCODING", key))
+
+    ### pipeline and scripts ###
+
+    @contextmanager
+    def pipeline(self, transaction: bool = True, bypass_breaker: bool = False) -> Iterator["RedisPipeline"]:
+        pipe = RedisPipeline(self.redis.pipeline(transaction=transaction), self.scripts, self.breaker, self.fallback_cache, bypass_breaker)
+        try:
+            yield pipe
+            pipe.execute()
+        finally:
+            pipe.reset()
+
+    def register_script(self, name: str, source: str):
+        self.scripts[name] = self.redis.register_script(source)
+        return self.scripts[name]
+
+    def run_script(self, name: str, keys: list[str], args: Optional[list] = None) -> any:
+        return self._call(f"script:{name}", lambda: self.scripts[name](keys=keys, args=args or []))
+
+
+class AsyncRedisHelper:
+    def __init__(self, redis: aioredis.Redis, breaker: CircuitBreaker = redis_breaker, fallback_cache: LRUCache = redis_fallback_cache):
+        self.redis = redis
+        self.breaker = breaker
+        self.fallback_cache = fallback_cache
+        self.scripts = {}
+        for name, source in LUA_SCRIPTS.items():
+            self.register_script(name, source)
+
+    async def _call(self, command: str, func: Callable, default: any = None, transform: Optional[Callable] = None, bypass_breaker: bool = False) -> any:
+        permit = self.breaker.acquire(bypass_breaker)
+        if permit is None and not bypass_breaker:
+            return default
+        started, span = _start(command)
+        failed = True
         try:
-            return self.redis.zrem(name, member) > 0
+            result = await func()
+            failed = False
+            return transform(result) if transform else result
         except Exception as e:
-            print(f"Redis ZRem Error: {e}")
-            return False
+            redis_command_errors.inc(command)
+            logger.warning("Redis command failed", extra={"command": command, "error": repr(e)})
+            return default
+        finally:
+            _finish(self.breaker, permit, command, started, span, failed)
+
+    async def set(self, key: str, value: any, ex: Optional[int] = None, bypass_breaker: bool = False) -> bool:
+        self.fallback_cache.delete(key)
+        return await self._call("set", lambda: self.redis.set(key, _encode(value), ex=ex), False, _true, bypass_breaker)
+
+    async def get(self, key: str, default: any = None) -> Optional[str]:
+        return _remember(self.fallback_cache, key, await self._call("get", lambda: self.redis.get(key), UNAVAILABLE), default)
+
+    async def delete(self, key: str) -> bool:
+        self.fallback_cache.delete(key)
+        return await self._call("delete", lambda: self.redis.delete(key), False, _positive)
+
+    async def exists(self, key: str) -> bool:
+        return await self._call("exists", lambda: self.redis.exists(key), False, _positive)
+
+    async def expire(self, key: str, seconds: int) -> bool:
+        return await self._call("expire", lambda: self.redis.expire(key, seconds), False)
+
+    async def mget(self, keys: list[str], default: any = None) -> list[Optional[str]]:
+        values = await self._call("mget", lambda: self.redis.mget(keys), UNAVAILABLE)
+        if values is UNAVAILABLE:
+            values = [UNAVAILABLE] * len(keys)
+        return [_remember(self.fallback_cache, key, value, default) for key, value in zip(keys, values)]
+
+    async def mset(self, mapping: dict[str, any], ex: Optional[Union[int, dict[str, int]]] = None) -> bool:
+        _forget(self.fallback_cache, mapping)
+        async def mset():
+            if ex is None:
+                return await self.redis.mset({key: _encode(value) for key, value in mapping.items()})
+
+            pipe = self.redis.pipeline(transaction=False)
+            for key, value in mapping.items():
+                pipe.set(key, _encode(value), ex=ex.get(key) if isinstance(ex, dict) else ex)
+            return all(await pipe.execute())
+
+        return await self._call("mset", mset, False)
+
+    async def incr_with_ttl(self, key: str, seconds: int, amount: int = 1) -> int:
+        self.fallback_cache.delete(key)
+        return await self._call("incr_with_ttl", lambda: self.scripts["incr_with_ttl"](keys=[key], args=[amount, seconds]), -1)
+
+    async def compare_and_set(self, key: str, expected: Optional[str], value: any, ex: Optional[int] = None) -> bool:
+        args = ["" if expected is None else expected, _encode(value), ex or 0, int(expected is None)]
+        self.fallback_cache.delete(key)
+        return await self._call("compare_and_set", lambda: self.scripts["compare_and_set"](keys=[key], args=args), False, _one)
+
+    async def compare_and_delete(self, key: str, expected: str) -> bool:
+        self.fallback_cache.delete(key)
+        return await self._call("compare_and_delete", lambda: self.scripts["compare_and_delete"](keys=[key], args=[expected]), False, _one)
+
+    ### list ###
+
+    async def lpush(self, key: str, *values) -> int:
+        return await self._call("lpush", lambda: self.redis.lpush(key, *values), -1)
+
+    async def rpush(self, key: str, *values) -> int:
+        return await self._call("rpush", lambda: self.redis.rpush(key, *values), -1)
+
+    async def lpop(self, key: str) -> Optional[str]:
+        return await self._call("lpop", lambda: self.redis.lpop(key))
+
+    async def rpop(self, key: str) -> Optional[str]:
+        return await self._call("rpop", lambda: self.redis.rpop(key))
+
+    async def lrange(self, key: str, start: int, end: int) -> list[str]:
+        return await self._call("lrange", lambda: self.redis.lrange(key, start, end), [])
         
-def get_redis_helper(redis: redis.Redis = Depends(get_redis)):
-    return RedisHelper(redis)
\ No newline at end of file
+    ### hash map ###
+
+    async def hset(self, name: str, key: Optional[str] = None, value: Optional[str] = None, mapping: Optional[dict[str, any]] = None) -> bool:
+        return await self._call("hset", lambda: self.redis.hset(name, key, value, mapping=mapping), False, _positive)
+
+    async def hget(self, name: str, key: str) -> Optional[str]:
+        return await self._call("hget", lambda: self.redis.hget(name, key))
+
+    async def hmget(self, name: str, keys: list[str]) -> list[Optional[str]]:
+        return await self._call("hmget", lambda: self.redis.hmget(name, keys), [None] * len(keys))
+
+    async def hdel(self, name: str, key: str) -> bool:
+        return await self._call("hdel", lambda: self.redis.hdel(name, key), False, _positive)
+
+    async def hgetall(self, name: str) -> dict[str, str]:
+        return await self._call("hgetall", lambda: self.redis.hgetall(name), {})
+        
+    ### Sorted Set (ZSet) ###
+    
+    async def zadd(self, name: str, mapping: dict[str, float]) -> bool:
+        return await self._call("zadd", lambda: self.redis.zadd(name, mapping), False, _positive)
+
+    async def zrange(self, name: str, start: int, end: int, withscores: bool = False, default: any = None) -> list[tuple[str, float]]:
+        return await self._call("zrange", lambda: self.redis.zrange(name, start, end, withscores=withscores), [] if default is None else default)
+
+    async def zremove(self, name: str, member: str) -> bool:
+        return await self._call("zrem", lambda: self.redis.zrem(name, member), False, _positive)
+
+    ### keyspace ###
+
+    async def scan(self, cursor: int = 0, match: Optional[str] = None, count: int = 1000) -> tuple[int, list[str]]:
+        return await self._call("scan", lambda: self.redis.scan(cursor, match=match, count=count), (0, []))
+
+    async def unlink(self, keys: list[str]) -> int:
+        _forget(self.fallback_cache, keys)
+        return await self._call("unlink", lambda: self.redis.unlink(*keys), 0) if keys else 0
+
+    async def memory_usage(self, key: str) -> Optional[int]:
+        return await self._call("memory_usage", lambda: self.redis.memory_usage(key, samples=0))
+
+    async def object_encoding(self, key: str) -> Optional[str]:
+        return await self._call("object_encoding", lambda: self.redis.object("ENCODING", key))
+
+    ### pipeline and scripts ###
+
+    @asynccontextmanager
+    async def pipeline(self, transaction: bool = True, bypass_breaker: bool = False) -> AsyncIterator["AsyncRedisPipeline"]:
+        pipe = AsyncRedisPipeline(self.redis.pipeline(transaction=transaction), self.scripts, self.breaker, self.fallback_cache, bypass_breaker)
+        try:
+            yield pipe
+            await pipe.execute()
+        finally:
+            await pipe.reset()
+
+    def register_script(self, name: str, source: str):
+        self.scripts[name] = self.redis.register_script(source)
+        return self.scripts[name]
+
+    async def run_script(self, name: str, keys: list[str], args: Optional[list] = None) -> any:
+        return await self._call(f"script:{name}", lambda: self.scripts[name](keys=keys, args=args or []))
+
+
+_redis_helper: Optional[RedisHelper] = None
+_async_redis_helper: Optional[AsyncRedisHelper] = None
+
+
+def get_redis_helper() -> RedisHelper:
+    global _redis_helper
+    client = get_redis()
+    if _redis_helper is None or _redis_helper.redis is not client:
+        _redis_helper = RedisHelper(client)
+    return _redis_helper
+
+
+async def get_async_redis_helper() -> AsyncRedisHelper:
+    global _async_redis_helper
+    client = get_async_redis()
+    if _async_redis_helper is None or _async_redis_helper.redis is not client:
+        _async_redis_helper = AsyncRedisHelper(client)
+    return _async_redis_helper
\ No newline at end of file
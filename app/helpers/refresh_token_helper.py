@@ -0,0 +1,106 @@
+import hashlib
+import secrets
+from dataclasses import dataclass
+from typing import Optional
+from fastapi import Depends
+from app.config import REFRESH_TOKEN_EXPIRATION_DAYS
+from app.helpers.redis_helper import AsyncRedisHelper, get_async_redis_helper
+
+TOKEN_PREFIX = "refresh_token:"
+FAMILY_PREFIX = "refresh_family:"
+
+# KEYS[1] presented token, KEYS[2] replacement token; ARGV[1] ttl, ARGV[2] family key prefix.
+# Returns {1, user_id, email, username} on rotation, {0} for an unknown token,
+# {-1} when a used token is replayed (the whole family is revoked) and {-2} for a revoked family.
+ROTATE_SCRIPT = """
+    local data = redis.call('HMGET', KEYS[1], 'u', 'e', 'n', 'f', 'used')
+    if not data[1] then
+        return {0}
+    end
+    local family_key = ARGV[2] .. data[4]
+    if data[5] == '1' then
+        redis.call('DEL', family_key)
+        return {-1}
+    end
+    if redis.call('EXISTS', family_key) == 0 then
+        return {-2}
+    end
+    redis.call('HSET', KEYS[1], 'used', '1')
+    redis.call('HSET', KEYS[2], 'u', data[1], 'e', data[2], 'n', data[3], 'f', data[4], 'used', '0')
+    redis.call('EXPIRE', KEYS[2], ARGV[1])
+    redis.call('EXPIRE', family_key, ARGV[1])
+    return {1, data[1], data[2], data[3]}
+"""
+
+REVOKE_SCRIPT = """
+    local family = redis.call('HGET', KEYS[1], 'f')
+    if not family then
+        return 0
+    end
+    return redis.call('DEL', ARGV[1] .. family)
+"""
+
+ROTATED = 1
+UNKNOWN = 0
+REUSED = -1
+REVOKED = -2
+
+
+@dataclass
+class RefreshResult:
+    status: int
+    refresh_token: Optional[str] = None
+    user_id: Optional[int] = None
+    email: Optional[str] = None
+    username: Optional[str] = None
+
+
+def _token_key(token: str) -> str:
+    return TOKEN_PREFIX + hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+class RefreshTokenHelper:
+    def __init__(self, redis_helper: AsyncRedisHelper, ttl_seconds: int = REFRESH_TOKEN_EXPIRATION_DAYS * 86400):
+        self.redis_helper = redis_helper
+        self.ttl_seconds = ttl_seconds
+        if "refresh_rotate" not in redis_helper.scripts:
+            redis_helper.register_script("refresh_rotate", ROTATE_SCRIPT)
+            redis_helper.register_script("refresh_revoke", REVOKE_SCRIPT)
+
+    async def issue(self, user_id: int, email: str, username: str) -> Optional[str]:
+        token = secrets.token_urlsafe(32)
+        family = secrets.token_hex(16)
+        async with self.redis_helper.pipeline(transaction=True) as pipe:
+            pipe.hset(_token_key(token), mapping={"u": user_id, "e": email, "n": username, "f": family, "used": "0"})
+            pipe.expire(_token_key(token), self.ttl_seconds)
+            pipe.set(FAMILY_PREFIX + family, "1", ex=self.ttl_seconds)
+        if not all(pipe.results):
+            return None
+        return token
+
+    async def rotate(self, token: str) -> Optional[RefreshResult]:
+        new_token = secrets.token_urlsafe(32)
+        result = await self.redis_helper.run_script(
+            "refresh_rotate",
+            keys=[_token_key(token), _token_key(new_token)],
+            args=[self.ttl_seconds, FAMILY_PREFIX],
+        )
+        if result is None:
+            return None
+        if result[0] != ROTATED:
+            return RefreshResult(status=result[0])
+        return RefreshResult(
+            status=ROTATED,
+            refresh_token=new_token,
+            user_id=int(result[1]),
+            email=result[2],
+            username=result[3],
+        )
+
+    async def revoke(self, token: str) -> bool:
+        result = await self.redis_helper.run_script("refresh_revoke", keys=[_token_key(token)], args=[FAMILY_PREFIX])
+        return bool(result)
+
+
+async def get_refresh_token_helper(redis_helper: AsyncRedisHelper = Depends(get_async_redis_helper)) -> RefreshTokenHelper:
+    return RefreshTokenHelper(redis_helper)
@@ -0,0 +1,268 @@
+import base64
+import hashlib
+import secrets
+import time
+from dataclasses import dataclass
+from typing import Optional
+from fastapi import Depends, HTTPException, Request, status
+from app.config import (
+    SESSION_COOKIE_NAME,
+    SESSION_IDLE_TTL_SECONDS,
+    SESSION_MAX_AGE_SECONDS,
+    SESSION_TOUCH_INTERVAL_SECONDS,
+    SESSION_MAX_PER_USER,
+)
+from app.helpers.redis_helper import RedisHelper, AsyncRedisHelper, UNAVAILABLE, get_async_redis_helper
+
+SESSION_PREFIX = "session:"
+INDEX_PREFIX = "user_sessions:"
+LEGACY_MARKER_PATTERN = "user:email_*"
+
+# Fields are single letters and values stay under 64 bytes, so each session hash
+# keeps Redis' compact listpack encoding instead of a full hash table.
+#   u user id, c created at, s last seen (epoch seconds), i client ip, a user agent
+# The per-user index is a sorted set of session ids scored by idle expiry time.
+
+# KEYS[1] session, KEYS[2] index; ARGV: id, user id, now, idle ttl, max age, max per user,
+# session prefix, ip, user agent. Evicts the least recently active sessions over the cap.
+CREATE_SCRIPT = """
+    redis.call('HSET', KEYS[1], 'u', ARGV[2], 'c', ARGV[3], 's', ARGV[3], 'i', ARGV[8], 'a', ARGV[9])
+    redis.call('EXPIRE', KEYS[1], ARGV[4])
+    redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[3])
+    redis.call('ZADD', KEYS[2], tonumber(ARGV[3]) + tonumber(ARGV[4]), ARGV[1])
+    local excess = redis.call('ZCARD', KEYS[2]) - tonumber(ARGV[6])
+    if excess > 0 then
+        for _, member in ipairs(redis.call('ZRANGE', KEYS[2], 0, excess - 1)) do
+            redis.call('DEL', ARGV[7] .. member)
+        end
+        redis.call('ZREMRANGEBYRANK', KEYS[2], 0, excess - 1)
+    end
+    redis.call('EXPIRE', KEYS[2], ARGV[5])
+    return math.max(excess, 0)
+"""
+
+# KEYS[1] session; ARGV: id, now, idle ttl, max age, touch interval, index prefix.
+# Returns {0} for an unknown or expired session, otherwise {1, u, c, s, i, a}. The TTL
+# only slides once per touch interval so reads do not turn into a write per request.
+TOUCH_SCRIPT = """
+    local data = redis.call('HMGET', KEYS[1], 'u', 'c', 's', 'i', 'a')
+    if not data[1] then
+        return {0}
+    end
+    local now = tonumber(ARGV[2])
+    local index = ARGV[6] .. data[1]
+    if now - tonumber(data[2]) >= tonumber(ARGV[4]) then
+        redis.call('DEL', KEYS[1])
+        redis.call('ZREM', index, ARGV[1])
+        return {0}
+    end
+    if now - tonumber(data[3]) >= tonumber(ARGV[5]) then
+        redis.call('HSET', KEYS[1], 's', ARGV[2])
+        redis.call('EXPIRE', KEYS[1], ARGV[3])
+        redis.call('ZADD', index, now + tonumber(ARGV[3]), ARGV[1])
+        redis.call('EXPIRE', index, ARGV[4])
+        data[3] = ARGV[2]
+    end
+    return {1, data[1], data[2], data[3], data[4], data[5]}
+"""
+
+# KEYS[1] session, KEYS[2] index of the caller; ARGV: id, user id.
+REVOKE_SCRIPT = """
+    local removed = redis.call('ZREM', KEYS[2], ARGV[1])
+    if redis.call('HGET', KEYS[1], 'u') == ARGV[2] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return removed
+"""
+
+# KEYS[1] index; ARGV: session prefix, id to keep ('' keeps none).
+REVOKE_ALL_SCRIPT = """
+    local removed = 0
+    for _, member in ipairs(redis.call('ZRANGE', KEYS[1], 0, -1)) do
+        if member ~= ARGV[2] then
+            removed = removed + redis.call('DEL', ARGV[1] .. member)
+            redis.call('ZREM', KEYS[1], member)
+        end
+    end
+    return removed
+"""
+
+# KEYS[1] index; ARGV: now, session prefix. Drops entries whose session expired or is gone.
+SWEEP_SCRIPT = """
+    local removed = redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+    for _, member in ipairs(redis.call('ZRANGE', KEYS[1], 0, -1)) do
+        if redis.call('EXISTS', ARGV[2] .. member) == 0 then
+            removed = removed + redis.call('ZREM', KEYS[1], member)
+        end
+    end
+    return removed
+"""
+
+
+@dataclass
+class Session:
+    id: str
+    user_id: int
+    created_at: int
+    last_seen_at: int
+    ip: str
+    user_agent: str
+
+
+def session_id(token: str) -> str:
+    # The cookie holds the token; Redis only ever sees a digest of it.
+    digest = hashlib.sha256(token.encode('utf-8')).digest()[:16]
+    return base64.urlsafe_b64encode(digest).decode('ascii').rstrip("=")
+
+
+def _unavailable() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Session service unavailable")
+
+
+class SessionStore:
+    def __init__(
+        self,
+        redis_helper: AsyncRedisHelper,
+        idle_ttl: int = SESSION_IDLE_TTL_SECONDS,
+        max_age: int = SESSION_MAX_AGE_SECONDS,
+        touch_interval: int = SESSION_TOUCH_INTERVAL_SECONDS,
+        max_per_user: int = SESSION_MAX_PER_USER,
+    ):
+        self.redis_helper = redis_helper
+        self.idle_ttl = idle_ttl
+        self.max_age = max_age
+        self.touch_interval = touch_interval
+        self.max_per_user = max_per_user
+        if "session_create" not in redis_helper.scripts:
+            redis_helper.register_script("session_create", CREATE_SCRIPT)
+            redis_helper.register_script("session_touch", TOUCH_SCRIPT)
+            redis_helper.register_script("session_revoke", REVOKE_SCRIPT)
+            redis_helper.register_script("session_revoke_all", REVOKE_ALL_SCRIPT)
+
+    async def create(self, user_id: int, ip: str = "", user_agent: str = "") -> str:
+        token = secrets.token_urlsafe(32)
+        sid = session_id(token)
+        result = await self.redis_helper.run_script(
+            "session_create",
+            keys=[SESSION_PREFIX + sid, f"{INDEX_PREFIX}{user_id}"],
+            args=[sid, user_id, int(time.time()), self.idle_ttl, self.max_age, self.max_per_user, SESSION_PREFIX, ip[:45], user_agent[:64]],
+        )
+        if result is None:
+            raise _unavailable()
+        return token
+
+    async def touch(self, token: str) -> Optional[Session]:
+        sid = session_id(token)
+        result = await self.redis_helper.run_script(
+            "session_touch",
+            keys=[SESSION_PREFIX + sid],
+            args=[sid, int(time.time()), self.idle_ttl, self.max_age, self.touch_interval, INDEX_PREFIX],
+        )
+        if result is None:
+            raise _unavailable()
+        if result[0] != 1:
+            return None
+        return Session(sid, int(result[1]), int(result[2]), int(result[3]), result[4] or "", result[5] or "")
+
+    async def list_for_user(self, user_id: int) -> list[Session]:
+        sids = await self.redis_helper.zrange(f"{INDEX_PREFIX}{user_id}", 0, -1, default=UNAVAILABLE)
+        if sids is UNAVAILABLE:
+            raise _unavailable()
+        if not sids:
+            return []
+        async with self.redis_helper.pipeline(transaction=False) as pipe:
+            for sid in sids:
+                pipe.hmget(SESSION_PREFIX + sid, ["u", "c", "s", "i", "a"])
+        if any(result is None for result in pipe.results):
+            raise _unavailable()
+
+        sessions = []
+        for sid, (owner, created_at, last_seen_at, ip, user_agent) in zip(sids, pipe.results):
+            # Entries whose hash already expired are left for the sweeper.
+            if owner == str(user_id):
+                sessions.append(Session(sid, user_id, int(created_at), int(last_seen_at), ip or "", user_agent or ""))
+        return sorted(sessions, key=lambda session: session.last_seen_at, reverse=True)
+
+    async def revoke(self, user_id: int, sid: str) -> bool:
+        result = await self.redis_helper.run_script(
+            "session_revoke", keys=[SESSION_PREFIX + sid, f"{INDEX_PREFIX}{user_id}"], args=[sid, user_id]
+        )
+        if result is None:
+            raise _unavailable()
+        return bool(result)
+
+    async def revoke_all(self, user_id: int, keep: Optional[str] = None) -> int:
+        result = await self.redis_helper.run_script(
+            "session_revoke_all", keys=[f"{INDEX_PREFIX}{user_id}"], args=[SESSION_PREFIX, keep or ""]
+        )
+        if result is None:
+            raise _unavailable()
+        return result
+
+
+class SessionMaintenance:
+    def __init__(self, redis_helper: RedisHelper):
+        self.redis_helper = redis_helper
+        if "session_sweep" not in redis_helper.scripts:
+            redis_helper.register_script("session_sweep", SWEEP_SCRIPT)
+
+    def _scan(self, pattern: str, count: int):
+        cursor = 0
+        while True:
+            cursor, keys = self.redis_helper.scan(cursor, match=pattern, count=count)
+            yield keys
+            if not cursor:
+                return
+
+    def sweep(self, count: int = 1000) -> dict:
+        now = int(time.time())
+        indexes = removed = 0
+        for keys in self._scan(f"{INDEX_PREFIX}*", count):
+            for key in keys:
+                indexes += 1
+                removed += self.redis_helper.run_script("session_sweep", keys=[key], args=[now, SESSION_PREFIX]) or 0
+        return {"indexes": indexes, "removed": removed}
+
+    def purge_legacy_markers(self, count: int = 1000) -> int:
+        return sum(self.redis_helper.unlink(keys) for keys in self._scan(LEGACY_MARKER_PATTERN, count))
+
+    def _measure(self, pattern: str, sample: int, count: int) -> dict:
+        total, sampled, encodings = 0, [], {}
+        for keys in self._scan(pattern, count):
+            total += len(keys)
+            for key in keys[:max(0, sample - len(sampled))]:
+                size = self.redis_helper.memory_usage(key)
+                if size is None:
+                    continue
+                sampled.append(size)
+                encoding = self.redis_helper.object_encoding(key) or "unknown"
+                encodings[encoding] = encodings.get(encoding, 0) + 1
+        average = sum(sampled) / len(sampled) if sampled else 0.0
+        return {"keys": total, "sampled": len(sampled), "avg_bytes": round(average, 1), "encodings": encodings}
+
+    def memory_report(self, sample: int = 1000, count: int = 1000) -> dict:
+        sessions = self._measure(f"{SESSION_PREFIX}*", sample, count)
+        indexes = self._measure(f"{INDEX_PREFIX}*", sample, count)
+        legacy = self._measure(LEGACY_MARKER_PATTERN, sample, count)
+        estimated = sessions["keys"] * sessions["avg_bytes"] + indexes["keys"] * indexes["avg_bytes"]
+        return {
+            "sessions": sessions,
+            "indexes": indexes,
+            "legacy_markers": legacy,
+            "estimated_bytes": round(estimated),
+            "bytes_per_session": round(estimated / sessions["keys"], 1) if sessions["keys"] else 0.0,
+        }
+
+
+async def get_session_store(redis_helper: AsyncRedisHelper = Depends(get_async_redis_helper)) -> SessionStore:
+    return SessionStore(redis_helper)
+
+
+async def get_current_session(request: Request, session_store: SessionStore = Depends(get_session_store)) -> Session:
+    token = request.cookies.get(SESSION_COOKIE_NAME)
+    if not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not logged in")
+    session = await session_store.touch(token)
+    if session is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired session")
+    return session
@@ -0,0 +1,221 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable, Optional
+import redis.asyncio as aioredis
+from fastapi import Depends
+from app.config import (
+    USER_CACHE_ENABLED,
+    USER_CACHE_SIZE,
+    USER_CACHE_LOCAL_TTL,
+    USER_CACHE_REDIS_TTL,
+    USER_CACHE_NEGATIVE_TTL,
+    USER_CACHE_TOMBSTONE_TTL,
+)
+from app.helpers.cache_helper import LRUCache, MISSING, invalidation_failed
+from app.metrics import registry
+from app.helpers.redis_helper import AsyncRedisHelper, RedisHelper, get_async_redis_helper
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "user_cache:"
+NEGATIVE = ""
+# Left in place of an invalidated entry; fills only write absent keys, so a lookup
+# that read the row before the write cannot re-cache it.
+TOMBSTONE = "-"
+INVALIDATION_CHANNEL = "user_cache:invalidate"
+
+
+# Emails compare case-insensitively in the database (MySQL's default collation), so
+# every email cache key is lowercased: a lookup or negative entry for "Foo@x" and the
+# canonical "foo@x" must share one entry.
+def _cache_value(field: str, value):
+    return value.lower() if field == "email" else value
+
+
+@dataclass(frozen=True)
+class UserRecord:
+    id: int
+    username: str
+    email: str
+    password: str
+
+    def dumps(self) -> str:
+        return json.dumps({"i": self.id, "u": self.username, "e": self.email, "p": self.password}, separators=(",", ":"))
+
+    @classmethod
+    def loads(cls, data: str) -> "UserRecord":
+        value = json.loads(data)
+        return cls(id=value["i"], username=value["u"], email=value["e"], password=value["p"])
+
+
+class UserCacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.lookups = {"local": 0, "redis": 0, "db": 0}
+        self.latency_sum = {"local": 0.0, "redis": 0.0, "db": 0.0}
+
+    def record(self, source: str, started: float):
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.lookups[source] += 1
+            self.latency_sum[source] += elapsed
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            total = sum(self.lookups.values())
+            cached = self.lookups["local"] + self.lookups["redis"]
+            return {
+                "lookups": dict(self.lookups),
+                "hit_ratio": cached / total if total else 0.0,
+                "avg_latency_seconds": {
+                    source: self.latency_sum[source] / count if count else 0.0
+                    for source, count in self.lookups.items()
+                },
+            }
+
+
+# Local tier entries are UserRecord or None (a cached "no such email").
+user_local_cache = LRUCache(USER_CACHE_SIZE, ttl=USER_CACHE_LOCAL_TTL, name="user")
+user_cache_stats = UserCacheStats()
+# Bumped whenever local entries are dropped. A lookup that started before a drop
+# does not fill the local tier, so it cannot undo an invalidation it raced with.
+_local_generation = 0
+
+
+def _drop_local(local_cache: LRUCache, keys: Optional[Iterable[tuple]] = None):
+    global _local_generation
+    _local_generation += 1
+    if keys is None:
+        local_cache.clear()
+        return
+    for key in keys:
+        local_cache.delete(key)
+
+
+def _invalidated_keys(user_id: Optional[int], emails: Iterable[str]) -> list[tuple]:
+    keys = [("id", user_id)] if user_id is not None else []
+    return keys + [("email", email) for email in {_cache_value("email", email) for email in emails}]
+
+
+@registry.register_collector
+def collect_user_cache():
+    snapshot = user_cache_stats.snapshot()
+    yield "user_lookups_total", "counter", "User lookups by the tier that answered", [
+        ("user_lookups_total", {"tier": tier}, count) for tier, count in snapshot["lookups"].items()
+    ]
+
+
+class UserCache:
+    def __init__(self, redis_helper: AsyncRedisHelper, local_cache: LRUCache = user_local_cache, stats: UserCacheStats = user_cache_stats):
+        self.redis_helper = redis_helper
+        self.local_cache = local_cache
+        self.stats = stats
+
+    # Returns a UserRecord, None for a cached "no such email", or MISSING.
+    async def get(self, field: str, value) -> object:
+        started = time.perf_counter()
+        value = _cache_value(field, value)
+        record = self.local_cache.get((field, value), MISSING)
+        if record is not MISSING:
+            self.stats.record("local", started)
+            return record
+
+        generation = _local_generation
+        data = await self.redis_helper.get(f"{KEY_PREFIX}{field}:{value}")
+        if data is None or data == TOMBSTONE:
+            return MISSING
+
+        record = None if data == NEGATIVE else UserRecord.loads(data)
+        if generation == _local_generation:
+            ttl = USER_CACHE_NEGATIVE_TTL if record is None else None
+            self.local_cache.set((field, value), record, expires_at=time.time() + ttl if ttl else None)
+        self.stats.record("redis", started)
+        return record
+
+    # Fills from a database read: only keys that are absent in Redis are written,
+    # and only those reach the local tier.
+    async def set(self, record: UserRecord):
+        generation = _local_generation
+        keys = [("id", record.id), ("email", _cache_value("email", record.email))]
+        data = record.dumps()
+        async with self.redis_helper.pipeline(transaction=False) as pipe:
+            for field, value in keys:
+                pipe.run_script("compare_and_set", [f"{KEY_PREFIX}{field}:{value}"], ["", data, USER_CACHE_REDIS_TTL, 1])
+        if generation != _local_generation:
+            return
+        for key, stored in zip(keys, pipe.results):
+            if stored == 1:
+                self.local_cache.set(key, record)
+
+    async def set_missing_email(self, email: str):
+        generation = _local_generation
+        email = _cache_value("email", email)
+        stored = await self.redis_helper.compare_and_set(f"{KEY_PREFIX}email:{email}", None, NEGATIVE, ex=USER_CACHE_NEGATIVE_TTL)
+        if stored and generation == _local_generation:
+            self.local_cache.set(("email", email), None, expires_at=time.time() + USER_CACHE_NEGATIVE_TTL)
+
+    # For a user that was just created: overwrites "no such email" entries and any
+    # tombstone, since no lookup can have read an older version of the row.
+    async def replace(self, record: UserRecord):
+        keys = [("id", record.id), ("email", _cache_value("email", record.email))]
+        _drop_local(self.local_cache, keys)
+        data = record.dumps()
+        async with self.redis_helper.pipeline(transaction=False, bypass_breaker=True) as pipe:
+            for field, value in keys:
+                pipe.set(f"{KEY_PREFIX}{field}:{value}", data, ex=USER_CACHE_REDIS_TTL)
+            pipe.publish(INVALIDATION_CHANNEL, json.dumps(keys))
+
+    async def invalidate(self, user_id: Optional[int] = None, *emails: str):
+        keys = _invalidated_keys(user_id, emails)
+        _drop_local(self.local_cache, keys)
+        async with self.redis_helper.pipeline(transaction=False, bypass_breaker=True) as pipe:
+            for field, value in keys:
+                pipe.set(f"{KEY_PREFIX}{field}:{value}", TOMBSTONE, ex=USER_CACHE_TOMBSTONE_TTL)
+            pipe.publish(INVALIDATION_CHANNEL, json.dumps(keys))
+        # Only a cached record can be stale for long; email-only invalidations drop
+        # "no such email" entries, which expire after USER_CACHE_NEGATIVE_TTL anyway.
+        if pipe.failed and user_id is not None:
+            raise invalidation_failed()
+
+
+# For sync callers such as the bulk importer: drop cached "no such email" entries.
+def invalidate_emails(redis_helper: RedisHelper, emails: Iterable[str]):
+    keys = _invalidated_keys(None, emails)
+    _drop_local(user_local_cache, keys)
+    with redis_helper.pipeline(transaction=False, bypass_breaker=True) as pipe:
+        for field, value in keys:
+            pipe.set(f"{KEY_PREFIX}{field}:{value}", TOMBSTONE, ex=USER_CACHE_TOMBSTONE_TTL)
+        pipe.publish(INVALIDATION_CHANNEL, json.dumps(keys))
+
+
+# Runs once per worker for its lifetime: applies invalidations published by other
+# workers to this worker's local tier. Messages sent while disconnected are lost,
+# so the local tier is cleared on every (re)subscribe.
+async def listen_for_invalidations(redis: aioredis.Redis, retry_interval: float = 1.0, max_retry_interval: float = 30.0):
+    delay = retry_interval
+    while True:
+        try:
+            async with redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                _drop_local(user_local_cache)
+                delay = retry_interval
+                while True:
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        _drop_local(user_local_cache, (tuple(key) for key in json.loads(message["data"])))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("User cache invalidation listener failed", extra={"error": repr(e), "retry_in": delay})
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_retry_interval)
+
+
+async def get_user_cache(redis_helper: AsyncRedisHelper = Depends(get_async_redis_helper)) -> Optional[UserCache]:
+    if not USER_CACHE_ENABLED:
+        return None
+    return UserCache(redis_helper)
@@ -0,0 +1,190 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Callable, Optional
+from app import config
+from app.metrics import registry
+
+# Set per request by RequestIdMiddleware. Tasks and threadpool calls started while
+# serving a request copy the context, so their records carry the same id.
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+log_records_dropped = registry.counter("log_records_dropped_total", "Log records dropped because the log queue was full")
+log_records_suppressed = registry.counter(
+    "log_records_suppressed_total", "Repeated warnings and errors suppressed by sampling", ("logger",)
+)
+
+# Attributes every LogRecord has; anything else was passed with `extra=` and is
+# written out as its own JSON field.
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id", "color_message"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, separators=(",", ":"))
+
+
+class ErrorSampler(logging.Filter):
+    # Lets the first `burst` warnings or errors from each call site through per
+    # `window` seconds and drops the rest. The next record from that site after the
+    # window rolls over carries the number suppressed. Lower levels are not sampled.
+    def __init__(self, burst: int, window: float, clock: Callable[[], float] = time.monotonic):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._sites: dict[tuple[str, int], list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.burst <= 0 or record.levelno < logging.WARNING:
+            return True
+        key = (record.pathname, record.lineno)
+        now = self.clock()
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None or now - site[0] >= self.window:
+                if site is not None and site[2]:
+                    record.suppressed = site[2]
+                self._sites[key] = [now, 1, 0]
+                return True
+            site[1] += 1
+            if site[1] <= self.burst:
+                return True
+            site[2] += 1
+        log_records_suppressed.inc(record.name)
+        return False
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    # Runs in the thread that logs: it only stamps the request id, renders the
+    # message and traceback (they cannot be rendered later) and enqueues. When the
+    # queue is full the record is dropped, never waited for; the next record that
+    # gets through reports how many were lost.
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self._dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.request_id = request_id.get()
+        record.message = record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if self._dropped:
+            record.dropped, self._dropped = self._dropped, 0
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self._dropped += 1
+            log_records_dropped.inc()
+
+    def handleError(self, record: logging.LogRecord):
+        pass
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # The base class uses put_nowait, which fails while the queue is full.
+        self.queue.put(self._sentinel, timeout=5)
+
+
+_listener: Optional[_QueueListener] = None
+_lock = threading.Lock()
+
+
+def configure_logging(level: str = config.LOG_LEVEL, log_format: str = config.LOG_FORMAT):
+    # Routes the root logger through a bounded queue; a background thread formats
+    # records and writes them to stderr, leaving stdout to CLI and benchmark output.
+    # Safe to call more than once per process.
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+        stream = logging.StreamHandler(sys.stderr)
+        stream.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+        log_queue = queue.Queue(maxsize=config.LOG_QUEUE_SIZE)
+        handler = NonBlockingQueueHandler(log_queue)
+        handler.addFilter(ErrorSampler(config.LOG_SAMPLE_BURST, config.LOG_SAMPLE_WINDOW_SECONDS))
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(level.upper())
+
+        _listener = _QueueListener(log_queue, stream)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    # Writes out whatever is still queued, then stops the writer thread.
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        listener, _listener = _listener, None
+    try:
+        listener.stop()
+    except queue.Full:
+        pass
+
+
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+
+class RequestIdMiddleware:
+    # Uses the caller's request id header when it looks sane, otherwise generates
+    # one, and echoes it on the response.
+    def __init__(self, app, header: str = config.REQUEST_ID_HEADER):
+        self.app = app
+        self.header = header.lower().encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        value = next((value.decode("latin-1") for name, value in scope["headers"] if name == self.header), "")
+        if not _REQUEST_ID.match(value):
+            value = uuid.uuid4().hex
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (self.header, value.encode("latin-1"))]
+            await send(message)
+
+        # Not reset on error: the server logs the unhandled exception in this same
+        # task afterwards, and that record should carry the id too.
+        token = request_id.set(value)
+        await self.app(scope, receive, send_wrapper)
+        request_id.reset(token)
@@ -1,19 +1,105 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-import uvicorn
-from fastapi import Depends
+from sqlalchemy.orm import configure_mappers
+from app import IMPORT_STARTED
 from app.routes import user_route
 from app.routes.otp_route import otp_route
 from app.routes.auth_route import auth_route
+from app.routes.jwks_route import jwks_route
+from app.routes.metrics_route import metrics_route
+from app.routes.admin_route import admin_route
+from app.helpers.password_helper import password_hasher
+from app.services.user_service import drain_rehash_tasks
+from app.helpers.user_cache_helper import listen_for_invalidations
+from app.redis import init_redis, close_redis, prewarm_redis, get_async_redis
+from app.database import init_db, dispose_db, prewarm_db, replicas
+from app.metrics import registry, startup_phase_duration, MetricsMiddleware
+from app.logging_config import configure_logging, RequestIdMiddleware
+from app.profiling import ProfilingMiddleware
+from app.config import (
+    METRICS_ENABLED,
+    USER_CACHE_ENABLED,
+    PROFILE_SECRET,
+    PROFILE_SAMPLE_RATE,
+    DB_PREWARM_CONNECTIONS,
+    REDIS_PREWARM_CONNECTIONS,
+    DB_REPLICA_HEALTH_CHECK_INTERVAL,
+    DB_REPLICA_HEALTH_CHECK_TIMEOUT,
+)
+from app import models  # noqa: F401  (mappers must be registered before configure_mappers)
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+
+def _timed(phase: str, started: float) -> float:
+    now = time.perf_counter()
+    startup_phase_duration.set(now - started, phase)
+    return now
+
+
+# Everything that touches the network or builds shared state happens here rather
+# than at import, and is done before the server starts accepting requests.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = phase = time.perf_counter()
+    configure_logging()
+    init_db()
+    init_redis()
+    phase = _timed("connect", phase)
+    configure_mappers()
+    phase = _timed("configure_mappers", phase)
+    try:
+        await prewarm_db(DB_PREWARM_CONNECTIONS)
+    except Exception as e:
+        logger.warning("DB prewarm failed", extra={"error": repr(e)})
+    phase = _timed("prewarm_db", phase)
+    try:
+        await prewarm_redis(REDIS_PREWARM_CONNECTIONS)
+    except Exception as e:
+        logger.warning("Redis prewarm failed", extra={"error": repr(e)})
+    _timed("prewarm_redis", phase)
+    _timed("lifespan", started)
+    health_checks = asyncio.create_task(
+        replicas.run_health_checks(DB_REPLICA_HEALTH_CHECK_INTERVAL, DB_REPLICA_HEALTH_CHECK_TIMEOUT)
+    ) if replicas.replicas else None
+    invalidations = asyncio.create_task(listen_for_invalidations(get_async_redis())) if USER_CACHE_ENABLED else None
+    yield
+    if health_checks:
+        health_checks.cancel()
+    if invalidations:
+        invalidations.cancel()
+        await asyncio.gather(invalidations, return_exceptions=True)
+    await drain_rehash_tasks()
+    await close_redis()
+    await dispose_db()
+    password_hasher.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+registry.enabled = METRICS_ENABLED
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+# Not installed at all unless enabled, so unprofiled deployments pay nothing.
+if PROFILE_SECRET or PROFILE_SAMPLE_RATE > 0:
+    app.add_middleware(ProfilingMiddleware)
+app.add_middleware(RequestIdMiddleware)
 
 app.include_router(user_route)
 app.include_router(otp_route)
 app.include_router(auth_route)
+app.include_router(jwks_route)
+app.include_router(metrics_route)
+app.include_router(admin_route)
 
 @app.get("/")
 def read_root():
     return {"Hello": "World"}
 
+startup_phase_duration.set(time.perf_counter() - IMPORT_STARTED, "import")
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    from app.server import serve
+    serve()
\ No newline at end of file
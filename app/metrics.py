@@ -0,0 +1,308 @@
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Iterable, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21)
+
+Sample = tuple[str, dict, float]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values: dict[tuple, object] = {}
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def labels_dict(self, labelvalues: tuple) -> dict:
+        return dict(zip(self.labelnames, labelvalues))
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labelvalues, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labels_dict(key))} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def dec(self, *labelvalues, amount: float = 1):
+        self.inc(*labelvalues, amount=-amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labelvalues):
+        # Buckets are stored non-cumulatively and summed at render time, so an
+        # observation is one bisect and three additions.
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labelvalues)
+            if entry is None:
+                entry = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        lines = self.header()
+        for key, counts, total, count in values:
+            labels = self.labels_dict(key)
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': _format_value(float(bound))})} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.enabled = True
+        self._metrics: dict[str, Metric] = {}
+        self._collectors: list[Callable[[], Iterable[tuple[str, str, str, list[Sample]]]]] = []
+
+    def _register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    # A collector is called at scrape time and yields (name, type, help, samples)
+    # for state that already lives elsewhere, such as pool sizes or cache stats.
+    # Each sample is (sample name, labels, value), so histograms can emit _bucket etc.
+    def register_collector(self, collector: Callable[[], Iterable[tuple[str, str, str, list[Sample]]]]):
+        self._collectors.append(collector)
+        return collector
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                families = list(collector())
+            except Exception:
+                logger.exception("Metrics collector failed", extra={"collector": getattr(collector, "__name__", repr(collector))})
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(f"{sample}{_format_labels(labels)} {_format_value(value)}" for sample, labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status")
+)
+http_requests_in_flight = registry.gauge("http_requests_in_flight", "HTTP requests currently being served")
+db_queries_per_request = registry.histogram(
+    "db_queries_per_request", "SQL statements issued per HTTP request", ("route",), buckets=COUNT_BUCKETS
+)
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds", "SQL statement latency by statement fingerprint", ("engine", "statement")
+)
+db_pool_checkout_wait = registry.histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", ("engine",)
+)
+redis_command_duration = registry.histogram(
+    "redis_command_duration_seconds", "Redis command latency as seen by RedisHelper", ("command",)
+)
+redis_command_errors = registry.counter("redis_command_errors_total", "Redis commands that raised", ("command",))
+startup_phase_duration = registry.gauge(
+    "app_startup_phase_seconds", "Wall time of each startup phase in this process", ("phase",)
+)
+
+# Per-request SQL statement counter; the middleware sets a fresh one-element list.
+request_query_count: ContextVar[Optional[list]] = ContextVar("request_query_count", default=None)
+
+# Set by ProfilingMiddleware (app.profiling) only for a request being profiled, so
+# the SQL and Redis hooks cost one ContextVar lookup otherwise.
+request_profile: ContextVar[Optional[object]] = ContextVar("request_profile", default=None)
+
+
+### SQL ###
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\bIN\s*\((?:\s*(?:\?|%s|:\w+|__\[POSTCOMPILE_\w+\])\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+_fingerprints: dict[str, str] = {}
+
+
+def fingerprint(statement: str) -> str:
+    # Statements come out of SQLAlchemy's compiled cache, so the set is small and
+    # stable; cache the normalized form and cap the cache for ad-hoc SQL.
+    cached = _fingerprints.get(statement)
+    if cached is not None:
+        return cached
+    normalized = _WHITESPACE.sub(" ", statement).strip()
+    normalized = _IN_LISTS.sub("IN (?)", _LITERALS.sub("?", normalized))
+    normalized = normalized[:200]
+    if len(_fingerprints) < 1000:
+        _fingerprints[statement] = normalized
+    return normalized
+
+
+def instrument_engine(engine: Engine, name: str):
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if registry.enabled:
+            conn.info.setdefault("query_started", []).append(time.perf_counter())
+        profile = request_profile.get()
+        if profile is not None:
+            conn.info.setdefault("profile_spans", []).append(profile.begin("sql", fingerprint(statement)))
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("profile_spans")
+        if spans:
+            spans.pop().end()
+        started = conn.info.get("query_started")
+        if not started:
+            return
+        db_query_duration.observe(time.perf_counter() - started.pop(), name, fingerprint(statement))
+        counter = request_query_count.get()
+        if counter is not None:
+            counter[0] += 1
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        info = context.connection.info if context.connection is not None else {}
+        started = info.get("query_started")
+        if started:
+            started.pop()
+        spans = info.get("profile_spans")
+        if spans:
+            spans.pop().end(error=True)
+
+    # Pools have no "before checkout" event, so wrap _do_get; dispose() builds a
+    # new pool, so wrap that one too.
+    def wrap_pool(pool):
+        do_get = pool._do_get
+
+        def timed_do_get():
+            if not registry.enabled:
+                return do_get()
+            started = time.perf_counter()
+            try:
+                return do_get()
+            finally:
+                db_pool_checkout_wait.observe(time.perf_counter() - started, name)
+
+        pool._do_get = timed_do_get
+
+    wrap_pool(engine.pool)
+    event.listen(engine, "engine_disposed", lambda engine: wrap_pool(engine.pool))
+
+    instrumented_engines[name] = engine
+
+
+instrumented_engines: dict[str, Engine] = {}
+
+
+@registry.register_collector
+def collect_pools():
+    pools = [(name, engine.pool) for name, engine in instrumented_engines.items() if hasattr(engine.pool, "overflow")]
+    for metric, documentation, read in (
+        ("db_pool_size", "Configured pool size", lambda pool: pool.size()),
+        ("db_pool_checked_out", "Connections currently checked out", lambda pool: pool.checkedout()),
+        ("db_pool_overflow", "Connections open beyond pool_size", lambda pool: max(0, pool.overflow())),
+    ):
+        yield metric, "gauge", documentation, [(metric, {"engine": name}, read(pool)) for name, pool in pools]
+
+
+### HTTP ###
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not registry.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_code[0] = message["status"]
+            await send(message)
+
+        queries = [0]
+        token = request_query_count.set(queries)
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_flight.dec()
+            request_query_count.reset(token)
+            # Label by route template, not raw path, to keep cardinality bounded.
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            http_request_duration.observe(elapsed, scope["method"], route_path, str(status_code[0]))
+            db_queries_per_request.observe(queries[0], route_path)
@@ -0,0 +1,285 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+import anyio.to_thread
+from app import config
+from app.logging_config import request_id
+from app.metrics import registry, request_profile
+
+logger = logging.getLogger(__name__)
+
+profiles_written = registry.counter("profiles_written_total", "Request profiles written, by what triggered them", ("trigger",))
+profiles_skipped = registry.counter("profiles_skipped_total", "Requests not profiled although asked or sampled", ("reason",))
+
+_UNSAFE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def sign_profile_token(path: str, expires: int, secret: str) -> str:
+    signature = hmac.new(secret.encode("utf-8"), f"{expires}:{path}".encode("utf-8"), hashlib.sha256).hexdigest()
+    return f"{expires}.{signature}"
+
+
+def verify_profile_token(token: str, path: str, secret: str) -> bool:
+    # A token is bound to one path and expires, so a leaked one cannot be used to
+    # profile every endpoint indefinitely.
+    expires, _, _ = token.partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(sign_profile_token(path, int(expires), secret), token)
+
+
+def _label(kind: str, name: str) -> str:
+    # Folded stacks use ";" between frames and a space before the count.
+    return f"<{kind} {name[:80]}>".replace(";", ",")
+
+
+class Span:
+    __slots__ = ("profile", "kind", "name", "thread", "started", "duration", "error")
+
+    def __init__(self, profile: "RequestProfile", kind: str, name: str):
+        self.profile = profile
+        self.kind = kind
+        self.name = name
+        self.thread = threading.get_ident()
+        self.started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.error = False
+
+    def end(self, error: bool = False):
+        self.duration = time.perf_counter() - self.started
+        self.error = error
+        self.profile._close(self)
+
+    def as_dict(self, origin: float) -> dict:
+        return {
+            "kind": self.kind,
+            "name": self.name,
+            "start_ms": round((self.started - origin) * 1000, 3),
+            "duration_ms": None if self.duration is None else round(self.duration * 1000, 3),
+            "thread": "loop" if self.thread == self.profile.loop_thread else "worker",
+            "error": self.error,
+        }
+
+
+class RequestProfile:
+    # A background thread samples the request every `interval` seconds:
+    # - while the request's task runs on the event loop, the loop thread's stack
+    #   below the profiling middleware;
+    # - while a SQL statement or Redis command it issued runs in a threadpool
+    #   thread, that thread's stack with the span as the leaf;
+    # - otherwise the request is waiting, recorded as <await> plus the SQL or Redis
+    #   span it is waiting on, if any.
+    # The sampler needs the GIL, so CPU-bound stretches get fewer samples than the
+    # interval implies; the .json spans carry exact SQL and Redis timings.
+    def __init__(self, task: asyncio.Task, loop: asyncio.AbstractEventLoop, stop_frame, interval: float, max_seconds: float, max_spans: int):
+        self.task = task
+        self.loop = loop
+        self.stop_frame = stop_frame
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.max_spans = max_spans
+        self.loop_thread = threading.get_ident()
+        self.samples: dict[str, int] = {}
+        self.spans: list[Span] = []
+        self.dropped_spans = 0
+        self._open: list[Span] = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self.started = self.finished = 0.0
+
+    def begin(self, kind: str, name: str) -> Span:
+        span = Span(self, kind, name)
+        with self._lock:
+            self._open.append(span)
+            if len(self.spans) < self.max_spans:
+                self.spans.append(span)
+            else:
+                self.dropped_spans += 1
+        return span
+
+    def _close(self, span: Span):
+        with self._lock:
+            if span in self._open:
+                self._open.remove(span)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self.finished = time.perf_counter()
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        deadline = time.perf_counter() + self.max_seconds
+        while not self._stopped.wait(self.interval) and time.perf_counter() < deadline:
+            self._sample()
+
+    def _fold(self, frame, stop=None) -> list[str]:
+        names = []
+        while frame is not None and frame is not stop:
+            names.append(f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_name}")
+            frame = frame.f_back
+        names.reverse()
+        return names
+
+    def _sample(self):
+        frames = sys._current_frames()
+        if asyncio.current_task(self.loop) is self.task:
+            stack = self._fold(frames.get(self.loop_thread), self.stop_frame)
+        else:
+            with self._lock:
+                span = self._open[-1] if self._open else None
+            if span is not None and span.thread != self.loop_thread and span.thread in frames:
+                stack = ["<worker>"] + self._fold(frames[span.thread]) + [_label(span.kind, span.name)]
+            else:
+                stack = ["<await>"] + ([_label(span.kind, span.name)] if span is not None else [])
+        key = ";".join(stack) or "<unknown>"
+        self.samples[key] = self.samples.get(key, 0) + 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.samples.items()))
+
+    def report(self, **meta) -> dict:
+        with self._lock:
+            spans = [span.as_dict(self.started) for span in self.spans]
+        return {
+            **meta,
+            "duration_ms": round((self.finished - self.started) * 1000, 3),
+            "interval_ms": self.interval * 1000,
+            "samples": sum(self.samples.values()),
+            "spans": spans,
+            "dropped_spans": self.dropped_spans,
+        }
+
+
+def enforce_retention(directory: str, max_bytes: int):
+    # Deletes the oldest profile files until the directory fits in max_bytes.
+    entries = []
+    with os.scandir(directory) as scan:
+        for entry in scan:
+            if entry.is_file() and entry.name.endswith((".folded", ".json")):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            return
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def write_profile(profile: RequestProfile, directory: str, max_bytes: int, meta: dict) -> str:
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    route = _UNSAFE.sub("_", meta["route"]).strip("_") or "root"
+    base = os.path.join(directory, f"{stamp}-{meta['method']}-{route}-{meta['request_id']}")
+    with open(f"{base}.folded", "w") as f:
+        f.write(profile.folded())
+    with open(f"{base}.json", "w") as f:
+        json.dump(profile.report(**meta), f, indent=2)
+    enforce_retention(directory, max_bytes)
+    return base
+
+
+class ProfilingMiddleware:
+    # Profiles a request when it carries a valid signed token in PROFILE_HEADER, or
+    # when it is picked at PROFILE_SAMPLE_RATE. Other requests pay for one header
+    # scan and, with sampling on, one random(). At most PROFILE_MAX_CONCURRENT
+    # requests are profiled at once per process.
+    def __init__(
+        self,
+        app,
+        secret: Optional[str] = config.PROFILE_SECRET,
+        sample_rate: float = config.PROFILE_SAMPLE_RATE,
+        header: str = config.PROFILE_HEADER,
+        directory: str = config.PROFILE_DIR,
+        max_bytes: int = config.PROFILE_DIR_MAX_BYTES,
+        interval: float = config.PROFILE_INTERVAL_MS / 1000,
+        max_seconds: float = config.PROFILE_MAX_SECONDS,
+        max_concurrent: int = config.PROFILE_MAX_CONCURRENT,
+        max_spans: int = config.PROFILE_MAX_SPANS,
+    ):
+        self.app = app
+        self.secret = secret
+        self.sample_rate = sample_rate
+        self.header = header.lower().encode("latin-1")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.max_concurrent = max_concurrent
+        self.max_spans = max_spans
+        self._active = 0
+
+    def _trigger(self, scope) -> Optional[str]:
+        token = next((value for name, value in scope["headers"] if name == self.header), None)
+        if token is not None and self.secret:
+            if verify_profile_token(token.decode("latin-1"), scope["path"], self.secret):
+                return "header"
+            profiles_skipped.inc("bad_token")
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        trigger = self._trigger(scope) if scope["type"] == "http" else None
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+        if self._active >= self.max_concurrent:
+            profiles_skipped.inc("busy")
+            await self.app(scope, receive, send)
+            return
+
+        status_code = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_code[0] = message["status"]
+            await send(message)
+
+        profile = RequestProfile(
+            asyncio.current_task(), asyncio.get_running_loop(), sys._getframe(),
+            self.interval, self.max_seconds, self.max_spans,
+        )
+        self._active += 1
+        token = request_profile.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.stop()
+            request_profile.reset(token)
+            self._active -= 1
+            meta = {
+                "request_id": request_id.get() or f"{random.getrandbits(64):016x}",
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(scope.get("route"), "path", "unmatched"),
+                "status": status_code[0],
+                "trigger": trigger,
+            }
+            try:
+                # The response has been sent; write off the event loop.
+                path = await anyio.to_thread.run_sync(write_profile, profile, self.directory, self.max_bytes, meta)
+                profiles_written.inc(trigger)
+                logger.info("Request profiled", extra={"profile": path, "duration_ms": round((profile.finished - profile.started) * 1000, 3)})
+            except Exception as e:
+                profiles_skipped.inc("write_failed")
+                logger.warning("Profile write failed", extra={"error": repr(e)})
@@ -1,5 +1,73 @@
+import time
 import redis
+import redis.asyncio as aioredis
+from typing import Optional
 from app import config
 
-def get_redis():
-    return redis.Redis(host=config.REDIS_HOST, port=config.REDIS_PORT, db=0, decode_responses=True)
+_redis: Optional[redis.Redis] = None
+_async_redis: Optional[aioredis.Redis] = None
+
+
+def _connection_kwargs() -> dict:
+    return dict(
+        host=config.REDIS_HOST,
+        port=config.REDIS_PORT,
+        db=config.REDIS_DB,
+        decode_responses=True,
+        max_connections=config.REDIS_MAX_CONNECTIONS,
+        timeout=config.REDIS_POOL_TIMEOUT,
+        socket_timeout=config.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=config.REDIS_SOCKET_CONNECT_TIMEOUT,
+        health_check_interval=config.REDIS_HEALTH_CHECK_INTERVAL,
+    )
+
+
+def init_redis(client: Optional[redis.Redis] = None, async_client: Optional[aioredis.Redis] = None):
+    global _redis, _async_redis
+    if client is not None:
+        _redis = client
+    elif _redis is None:
+        _redis = redis.Redis(connection_pool=redis.BlockingConnectionPool(**_connection_kwargs()))
+
+    if async_client is not None:
+        _async_redis = async_client
+    elif _async_redis is None:
+        _async_redis = aioredis.Redis(connection_pool=aioredis.BlockingConnectionPool(**_connection_kwargs()))
+
+
+async def prewarm_redis(connections: int) -> float:
+    # Check out and return `connections` pooled connections, so each is connected
+    # (and health-checked) before the first request needs it.
+    started = time.perf_counter()
+    pool = get_async_redis().connection_pool
+    conns = []
+    try:
+        for _ in range(min(connections, config.REDIS_MAX_CONNECTIONS)):
+            conns.append(await pool.get_connection("PING"))
+    finally:
+        for conn in conns:
+            await pool.release(conn)
+    return time.perf_counter() - started
+
+
+async def close_redis():
+    global _redis, _async_redis
+    if _async_redis is not None:
+        await _async_redis.aclose()
+        _async_redis = None
+    if _redis is not None:
+        _redis.close()
+        _redis.connection_pool.disconnect()
+        _redis = None
+
+
+def get_redis() -> redis.Redis:
+    if _redis is None:
+        init_redis()
+    return _redis
+
+
+def get_async_redis() -> aioredis.Redis:
+    if _async_redis is None:
+        init_redis()
+    return _async_redis
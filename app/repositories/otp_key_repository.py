@@ -1,9 +1,11 @@
+from sqlalchemy import select, insert
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends
-from app.models import OtpKey
-from app.database import get_db
+from app.models import OtpKey, User
+from app.database import get_db, get_async_db, read_only, read_from_replica
 from datetime import datetime, timezone
-from typing import Optional
+from typing import List, Optional
 
 class OtpKeyRepository:
     def __init__(self, db: Session):
@@ -15,6 +17,7 @@ class OtpKeyRepository:
     def find_otp_key_by_otp_key(self, otp_key: str) -> Optional[OtpKey]:
         return self.db.query(OtpKey).filter(OtpKey.otp_key == otp_key).first()
     
+    @read_only
     def find_otp_key_by_user_id(self, user_id: int) -> Optional[OtpKey]:
         return self.db.query(OtpKey).filter(OtpKey.user_id == user_id).first()
 
@@ -32,7 +35,66 @@ class OtpKeyRepository:
             self.db.commit()
             return True
         return False
+
+
+class AsyncOtpKeyRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def find_otp_key_by_id(self, otp_key_id: int) -> Optional[OtpKey]:
+        result = await self.db.execute(select(OtpKey).where(OtpKey.id == otp_key_id).limit(1))
+        return result.scalars().first()
+
+    async def find_otp_key_by_otp_key(self, otp_key: str) -> Optional[OtpKey]:
+        result = await self.db.execute(select(OtpKey).where(OtpKey.otp_key == otp_key).limit(1))
+        return result.scalars().first()
+
+    @read_only
+    async def find_otp_key_by_user_id(self, user_id: int) -> Optional[OtpKey]:
+        result = await self.db.execute(select(OtpKey).where(OtpKey.user_id == user_id).limit(1))
+        return result.scalars().first()
+
+    def read_from_replica(self) -> bool:
+        return read_from_replica(self.db)
+
+    async def find_user_with_otp_key(self, user_id: int) -> tuple[Optional[User], Optional[OtpKey]]:
+        result = await self.db.execute(
+            select(User, OtpKey).outerjoin(OtpKey, OtpKey.user_id == User.id).where(User.id == user_id).limit(1)
+        )
+        row = result.first()
+        return (row[0], row[1]) if row else (None, None)
+
+    async def create_otp_key(self, otp_key: str, user_id: int) -> OtpKey:
+        db_otp_key = OtpKey(otp_key=otp_key, user_id=user_id, created_at=datetime.now(timezone.utc))
+        self.db.add(db_otp_key)
+        await self.db.commit()
+        await self.db.refresh(db_otp_key)
+        return db_otp_key
+
+    async def find_user_ids_with_otp_keys(self, user_ids: List[int]) -> set[int]:
+        result = await self.db.execute(select(OtpKey.user_id).where(OtpKey.user_id.in_(user_ids)).distinct())
+        return set(result.scalars().all())
+
+    async def create_otp_keys(self, keys: dict[int, str]) -> List[OtpKey]:
+        now = datetime.now(timezone.utc)
+        await self.db.execute(insert(OtpKey), [{"otp_key": key, "user_id": user_id, "created_at": now} for user_id, key in keys.items()])
+        await self.db.commit()
+        # MySQL has no INSERT ... RETURNING, so read the new rows back by their unique keys.
+        result = await self.db.execute(select(OtpKey).where(OtpKey.otp_key.in_(list(keys.values()))))
+        return list(result.scalars().all())
+
+    async def delete_otp_key(self, otp_key_id: int) -> bool:
+        db_otp_key = await self.db.get(OtpKey, otp_key_id)
+        if db_otp_key:
+            await self.db.delete(db_otp_key)
+            await self.db.commit()
+            return True
+        return False
     
 
 def get_otp_key_repository(db: Session = Depends(get_db)) -> OtpKeyRepository:
     return OtpKeyRepository(db)
+
+
+def get_async_otp_key_repository(db: AsyncSession = Depends(get_async_db)) -> AsyncOtpKeyRepository:
+    return AsyncOtpKeyRepository(db)
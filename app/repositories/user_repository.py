@@ -1,12 +1,22 @@
+import time
 from typing import List
+from sqlalchemy import select, insert, update, Row
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status, Depends
 from app.schemas.user_schema import UserCreate, UserUpdate
-from app.database import get_db
+from app.config import BCRYPT_ROUNDS
+from app.database import get_db, get_async_db, read_only, read_from_replica
+from app.helpers.password_helper import PasswordHasher, get_password_hasher
+from app.helpers.cache_helper import MISSING
+from app.helpers.user_cache_helper import UserCache, UserRecord, get_user_cache
 from app.models import User
 from datetime import datetime, timezone
 from bcrypt import hashpw, gensalt
-from typing import Optional
+from typing import AsyncIterator, Optional
+
+USER_PUBLIC_COLUMNS = (User.id, User.username, User.email, User.created_at, User.updated_at)
+
 
 class UserRepository:
     def __init__(self, db: Session):
@@ -16,6 +26,7 @@ class UserRepository:
         user = self.db.query(User).filter(User.id == user_id).first()
         return user
     
+    @read_only
     def find_user_by_email(self, email: str) -> Optional[User]:
         user = self.db.query(User).filter(User.email == email).first()
         return user
@@ -24,7 +35,7 @@ class UserRepository:
         return self.db.query(User).offset(skip).limit(limit).all()
 
     def create_user(self, user: UserCreate) -> User:
-        db_user = User(email=user.email, password=hashpw(user.password.encode('utf-8'), gensalt()).decode('utf-8'), username=user.username, created_at=datetime.now(timezone.utc), updated_at=datetime.now(timezone.utc))
+        db_user = User(email=user.email, password=hashpw(user.password.encode('utf-8'), gensalt(BCRYPT_ROUNDS)).decode('utf-8'), username=user.username, created_at=datetime.now(timezone.utc), updated_at=datetime.now(timezone.utc))
         self.db.add(db_user)
         self.db.commit()
         self.db.refresh(db_user)
@@ -42,7 +53,7 @@ class UserRepository:
             db_user.email = user.email
 
         if user.password is not None:
-            db_user.password = hashpw(user.password.encode('utf-8'), gensalt()).decode('utf-8')
+            db_user.password = hashpw(user.password.encode('utf-8'), gensalt(BCRYPT_ROUNDS)).decode('utf-8')
 
         self.db.commit()
         self.db.refresh(db_user)
@@ -57,6 +68,146 @@ class UserRepository:
         self.db.commit()
         return True
 
+    def find_existing_emails(self, emails: List[str]) -> set[str]:
+        rows = self.db.query(User.email).filter(User.email.in_(emails)).all()
+        return {row.email for row in rows}
+
+    def bulk_create_users(self, users: List[dict]) -> int:
+        self.db.execute(insert(User), users)
+        self.db.commit()
+        return len(users)
+
+
+class AsyncUserRepository:
+    def __init__(self, db: AsyncSession, password_hasher: PasswordHasher, user_cache: Optional[UserCache] = None):
+        self.db = db
+        self.password_hasher = password_hasher
+        self.user_cache = user_cache
+
+    async def find_user_by_id(self, user_id: int) -> Optional[UserRecord]:
+        return await self._find("id", user_id, User.id == user_id)
+
+    async def find_user_by_email(self, email: str) -> Optional[UserRecord]:
+        return await self._find("email", email, User.email == email)
+
+    async def get_users(self, skip: int = 0, limit: int = 10) -> List[User]:
+        result = await self.db.execute(select(User).offset(skip).limit(limit))
+        return list(result.scalars().all())
+
+    async def find_user_emails_by_ids(self, user_ids: List[int]) -> dict[int, str]:
+        result = await self.db.execute(select(User.id, User.email).where(User.id.in_(user_ids)))
+        return {row.id: row.email for row in result}
+
+    @read_only
+    async def get_users_after(self, after_id: Optional[int], limit: int = 20) -> List[Row]:
+        query = select(*USER_PUBLIC_COLUMNS).order_by(User.id).limit(limit)
+        if after_id is not None:
+            query = query.where(User.id > after_id)
+        result = await self.db.execute(query)
+        return list(result.all())
+
+    # Plain column rows rather than ORM entities, so nothing accumulates in the
+    # session's identity map; with yield_per the driver uses a server-side cursor.
+    async def stream_users(self, batch_size: int = 1000) -> AsyncIterator[List[Row]]:
+        result = await self.db.stream(
+            select(*USER_PUBLIC_COLUMNS).order_by(User.id).execution_options(yield_per=batch_size)
+        )
+        async for partition in result.partitions():
+            yield partition
+
+    async def create_user(self, user: UserCreate) -> User:
+        password = await self.password_hasher.hash(user.password)
+        db_user = User(email=user.email, password=password, username=user.username, created_at=datetime.now(timezone.utc), updated_at=datetime.now(timezone.utc))
+        self.db.add(db_user)
+        await self.db.commit()
+        await self.db.refresh(db_user)
+        if self.user_cache:
+            await self.user_cache.replace(UserRecord(db_user.id, db_user.username, db_user.email, db_user.password))
+        return db_user
+
+    async def update_user(self, user_id: int, user: UserUpdate) -> Optional[User]:
+        db_user = await self._get_user(user_id)
+        if db_user is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+        old_email = db_user.email
+        if user.username is not None:
+            db_user.username = user.username
+
+        if user.email is not None:
+            db_user.email = user.email
+
+        if user.password is not None:
+            db_user.password = await self.password_hasher.hash(user.password)
+
+        await self.db.commit()
+        await self.db.refresh(db_user)
+        if self.user_cache:
+            await self.user_cache.invalidate(user_id, old_email, db_user.email)
+        return db_user
+
+    # Compare-and-set on the old hash, so a password changed meanwhile is never overwritten.
+    async def update_password_hash(self, user_id: int, email: str, old_hash: str, new_hash: str) -> bool:
+        result = await self.db.execute(
+            update(User)
+            .where(User.id == user_id, User.password == old_hash)
+            .values(password=new_hash)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        if self.user_cache:
+            await self.user_cache.invalidate(user_id, email)
+        return result.rowcount == 1
+
+    async def delete_user(self, user_id: int) -> bool:
+        db_user = await self._get_user(user_id)
+        if db_user is None:
+            return False
+
+        email = db_user.email
+        await self.db.delete(db_user)
+        await self.db.commit()
+        if self.user_cache:
+            await self.user_cache.invalidate(user_id, email)
+        return True
+
+    async def _get_user(self, user_id: int) -> Optional[User]:
+        result = await self.db.execute(select(User).where(User.id == user_id).limit(1))
+        return result.scalars().first()
+
+    @read_only
+    async def _select_record(self, criteria) -> Optional[UserRecord]:
+        result = await self.db.execute(select(User.id, User.username, User.email, User.password).where(criteria).limit(1))
+        row = result.first()
+        return UserRecord(*row) if row else None
+
+    async def _find(self, field: str, value, criteria) -> Optional[UserRecord]:
+        if self.user_cache:
+            cached = await self.user_cache.get(field, value)
+            if cached is not MISSING:
+                return cached
+
+        started = time.perf_counter()
+        record = await self._select_record(criteria)
+        if self.user_cache:
+            self.user_cache.stats.record("db", started)
+            # A replica may still hold the row as it was before a write that has
+            # already invalidated the cache; serve it, but do not cache it.
+            if record:
+                if not read_from_replica(self.db):
+                    await self.user_cache.set(record)
+            elif field == "email":
+                await self.user_cache.set_missing_email(value)
+        return record
+
 
 def get_user_repository(db: Session = Depends(get_db)) -> UserRepository:
-    return UserRepository(db)
\ No newline at end of file
+    return UserRepository(db)
+
+
+def get_async_user_repository(
+    db: AsyncSession = Depends(get_async_db),
+    password_hasher: PasswordHasher = Depends(get_password_hasher),
+    user_cache: Optional[UserCache] = Depends(get_user_cache)
+) -> AsyncUserRepository:
+    return AsyncUserRepository(db, password_hasher, user_cache)
\ No newline at end of file
@@ -0,0 +1,88 @@
+import io
+import json
+import os
+import tempfile
+import threading
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from app.config import USER_IMPORT_BATCH_SIZE, USER_IMPORT_API_HASH_WORKERS, USER_IMPORT_API_MAX_CONCURRENT
+from app.database import SessionLocal
+from app.helpers.admin_helper import require_admin
+from app.helpers.redis_helper import get_redis_helper
+from app.repositories import UserRepository
+from app.services.user_import_service import UserImportService, ImportCheckpoint
+
+admin_route = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin)])
+
+import_slots = threading.BoundedSemaphore(USER_IMPORT_API_MAX_CONCURRENT)
+
+
+class ImportSpool:
+    # Owns an import's temp file and its concurrency slot. The upload error path, the
+    # report generator and the response's background task all call release(), since
+    # the generator never runs if the client disconnects before streaming starts.
+    def __init__(self, suffix: str):
+        self.file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self.file.close()
+        try:
+            os.unlink(self.file.name)
+        except FileNotFoundError:
+            pass
+        import_slots.release()
+
+
+@admin_route.post("/users/import")
+async def import_users(
+    request: Request,
+    format: Literal["jsonl", "csv"] = "jsonl",
+    start_line: int = 0,
+    batch_size: Optional[int] = None
+):
+    if not import_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Another import is running, please retry later",
+            headers={"Retry-After": "60"},
+        )
+    try:
+        spool = ImportSpool(f".{format}")
+    except BaseException:
+        import_slots.release()
+        raise
+
+    # Spool the upload to disk so memory stays flat however large the file is.
+    try:
+        async for chunk in request.stream():
+            spool.file.write(chunk)
+        spool.file.close()
+    except BaseException:
+        spool.release()
+        raise
+
+    # Runs in Starlette's threadpool; each progress line carries "line", which can be
+    # sent back as start_line to resume an interrupted import.
+    def report():
+        db = SessionLocal()
+        try:
+            with io.open(spool.file.name, encoding="utf-8", newline="") as stream:
+                service = UserImportService(
+                    UserRepository(db), get_redis_helper(), batch_size or USER_IMPORT_BATCH_SIZE,
+                    USER_IMPORT_API_HASH_WORKERS, backend="thread",
+                )
+                for entry in service.run(stream, format, ImportCheckpoint(line=start_line)):
+                    yield json.dumps(entry) + "\n"
+        finally:
+            db.close()
+            spool.release()
+
+    return StreamingResponse(report(), media_type="application/x-ndjson", background=BackgroundTask(spool.release))
@@ -1,5 +1,10 @@
-from fastapi import Depends, APIRouter
-from app.helpers.auth_helper import get_current_user, get_current_user_id
+from fastapi import Depends, APIRouter, HTTPException, Response, status
+from app.helpers.auth_helper import get_current_user, get_current_user_id, require_introspection_client
+from app.helpers.jwt_helper import JWTHelper, get_jwt_helper
+from app.helpers import refresh_token_helper as refresh
+from app.helpers.refresh_token_helper import RefreshTokenHelper, get_refresh_token_helper
+from app.schemas import TokenRefreshRequest, TokenResponse, TokenIntrospectRequest, TokenIntrospectResponse, TokenIntrospection
+from app.config import JWT_ACCESS_TOKEN_EXPIRATION_MINUTES
 from typing import Dict, Any
 
 auth_route = APIRouter(prefix="/auth", tags=["Authentication"])
@@ -25,4 +30,53 @@ async def get_user_profile(
         "user_id": user_id,
         "message": f"Profile for user ID: {user_id}",
         "protected": True
-    }
\ No newline at end of file
+    }
+
+
+@auth_route.post("/refresh", response_model=TokenResponse)
+async def refresh_access_token(
+    request: TokenRefreshRequest,
+    jwt_helper: JWTHelper = Depends(get_jwt_helper),
+    refresh_token_helper: RefreshTokenHelper = Depends(get_refresh_token_helper)
+):
+    result = await refresh_token_helper.rotate(request.refresh_token)
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Token service unavailable")
+
+    if result.status == refresh.REUSED:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token reuse detected, session revoked")
+    if result.status != refresh.ROTATED:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired refresh token")
+
+    access_token = jwt_helper.create_user_token(
+        user_id=result.user_id,
+        email=result.email,
+        username=result.username
+    )
+    return TokenResponse(
+        access_token=access_token,
+        refresh_token=result.refresh_token,
+        expires_in=JWT_ACCESS_TOKEN_EXPIRATION_MINUTES * 60
+    )
+
+
+@auth_route.post("/revoke")
+async def revoke_refresh_token(
+    request: TokenRefreshRequest,
+    refresh_token_helper: RefreshTokenHelper = Depends(get_refresh_token_helper)
+):
+    await refresh_token_helper.revoke(request.refresh_token)
+    return Response(status_code=204)
+
+
+# A plain `def` route: signature checks are CPU-bound, so FastAPI runs a batch in
+# its threadpool instead of blocking the event loop.
+@auth_route.post("/introspect", response_model=TokenIntrospectResponse, dependencies=[Depends(require_introspection_client)])
+def introspect_tokens(
+    request: TokenIntrospectRequest,
+    jwt_helper: JWTHelper = Depends(get_jwt_helper)
+):
+    return TokenIntrospectResponse(results=[
+        TokenIntrospection(active=True, claims=claims, exp=claims.get("exp")) if claims else TokenIntrospection(active=False)
+        for claims in jwt_helper.introspect_tokens(request.tokens)
+    ])
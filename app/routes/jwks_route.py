@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Request, Response
+from app.config import JWT_ALGORITHM, JWKS_CACHE_MAX_AGE
+from app.helpers.jwt_key_helper import key_ring, is_asymmetric
+
+jwks_route = APIRouter(prefix="/.well-known", tags=["JWKS"])
+
+
+@jwks_route.get("/jwks.json")
+async def get_jwks(request: Request):
+    if is_asymmetric(JWT_ALGORITHM):
+        key_ring.maybe_reload()
+
+    headers = {
+        "Cache-Control": f"public, max-age={JWKS_CACHE_MAX_AGE}",
+        "ETag": key_ring.jwks_etag,
+    }
+    if request.headers.get("if-none-match") == key_ring.jwks_etag:
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=key_ring.jwks_body, media_type="application/json", headers=headers)
@@ -0,0 +1,9 @@
+from fastapi import APIRouter, Response
+from app.metrics import registry
+
+metrics_route = APIRouter(tags=["Metrics"])
+
+
+@metrics_route.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,28 +1,30 @@
-from fastapi import Depends, APIRouter, HTTPException
-from app.schemas import OtpKeyCreate, OtpKeyResponse, OtpVerifyRequest, OtpVerifyResponse
-from app.services import OtpKeyService, get_otp_key_service
-from app.services import UserService, get_user_service
+from fastapi import Depends, APIRouter, HTTPException, Request
+from app.schemas import OtpKeyCreate, OtpKeyResponse, OtpVerifyRequest, OtpVerifyResponse, OtpBatchCreate, OtpBatchResponse
+from app.services import AsyncOtpKeyService, get_async_otp_key_service
+from app.services import AsyncUserService, get_async_user_service
 from app.helpers.jwt_helper import JWTHelper, get_jwt_helper
+from app.helpers.refresh_token_helper import RefreshTokenHelper, get_refresh_token_helper
+from app.helpers.rate_limit_helper import RateLimiter, get_rate_limiter, client_ip, OTP_VERIFY_LIMITS
+from app.helpers.admin_helper import require_admin
+from app.config import JWT_ACCESS_TOKEN_EXPIRATION_MINUTES
 
 otp_route = APIRouter(prefix="/otp", tags=["OTP"])
 
 
 @otp_route.post("/generate", response_model=OtpKeyResponse)
-def generate_otp_key(
+async def generate_otp_key(
     request: OtpKeyCreate,
-    otp_service: OtpKeyService = Depends(get_otp_key_service),
-    user_service: UserService = Depends(get_user_service)
+    otp_service: AsyncOtpKeyService = Depends(get_async_otp_key_service)
 ):
-    user = user_service.find_user_by_id(request.user_id)
+    user, existing_otp = await otp_service.find_user_with_otp_key(request.user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    existing_otp = otp_service.find_otp_key_by_user_id(request.user_id)
     if existing_otp:
         raise HTTPException(status_code=400, detail="OTP key already exists for this user")
     
-    otp_key = otp_service.create_otp_key(request.user_id)
-    qr_code_uri = otp_service.generate_qr_code_uri(request.user_id)
+    otp_key = await otp_service.create_otp_key(request.user_id)
+    qr_code_uri = otp_service.provisioning_uri(otp_key, user.email)
     
     return OtpKeyResponse(
         id=otp_key.id,
@@ -33,18 +35,33 @@ def generate_otp_key(
     )
 
 
+@otp_route.post("/generate/batch", response_model=OtpBatchResponse, dependencies=[Depends(require_admin)])
+async def generate_otp_keys_batch(
+    request: OtpBatchCreate,
+    otp_service: AsyncOtpKeyService = Depends(get_async_otp_key_service),
+    user_service: AsyncUserService = Depends(get_async_user_service)
+):
+    user_ids = list(dict.fromkeys(request.user_ids))
+    emails = await user_service.find_user_emails_by_ids(user_ids)
+    return await otp_service.create_otp_keys(user_ids, emails)
+
+
 @otp_route.post("/verify", response_model=OtpVerifyResponse)
-def verify_otp_code(
+async def verify_otp_code(
     request: OtpVerifyRequest,
-    otp_service: OtpKeyService = Depends(get_otp_key_service),
-    user_service: UserService = Depends(get_user_service),
-    jwt_helper: JWTHelper = Depends(get_jwt_helper)
+    http_request: Request,
+    otp_service: AsyncOtpKeyService = Depends(get_async_otp_key_service),
+    user_service: AsyncUserService = Depends(get_async_user_service),
+    jwt_helper: JWTHelper = Depends(get_jwt_helper),
+    refresh_token_helper: RefreshTokenHelper = Depends(get_refresh_token_helper),
+    rate_limiter: RateLimiter = Depends(get_rate_limiter)
 ):
-    is_valid = otp_service.verify_otp_code(request.user_id, request.otp_code)
+    await rate_limiter.enforce("otp_verify", OTP_VERIFY_LIMITS, ip=client_ip(http_request), user_id=request.user_id)
+    is_valid = await otp_service.verify_otp_code(request.user_id, request.otp_code)
     
     if is_valid:
         # Get user information for JWT
-        user = user_service.find_user_by_id(request.user_id)
+        user = await user_service.find_user_by_id(request.user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -54,32 +71,33 @@ def verify_otp_code(
             email=user.email,
             username=user.username
         )
+        refresh_token = await refresh_token_helper.issue(user.id, user.email, user.username)
         
         return OtpVerifyResponse(
             success=True, 
             message="OTP code is valid",
             access_token=access_token,
-            token_type="bearer"
+            refresh_token=refresh_token,
+            token_type="bearer",
+            expires_in=JWT_ACCESS_TOKEN_EXPIRATION_MINUTES * 60
         )
     else:
         return OtpVerifyResponse(success=False, message="Invalid OTP code")
 
 
 @otp_route.get("/{user_id}", response_model=OtpKeyResponse)
-def get_otp_key(
+async def get_otp_key(
     user_id: int,
-    otp_service: OtpKeyService = Depends(get_otp_key_service),
-    user_service: UserService = Depends(get_user_service)
+    otp_service: AsyncOtpKeyService = Depends(get_async_otp_key_service)
 ):
-    user = user_service.find_user_by_id(user_id)
+    user, otp_key = await otp_service.find_user_with_otp_key(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    otp_key = otp_service.find_otp_key_by_user_id(user_id)
     if not otp_key:
         raise HTTPException(status_code=404, detail="OTP key not found for this user")
     
-    qr_code_uri = otp_service.generate_qr_code_uri(user_id)
+    qr_code_uri = otp_service.provisioning_uri(otp_key, user.email)
     
     return OtpKeyResponse(
         id=otp_key.id,
@@ -91,20 +109,18 @@ def get_otp_key(
 
 
 @otp_route.delete("/{user_id}")
-def delete_otp_key(
+async def delete_otp_key(
     user_id: int,
-    otp_service: OtpKeyService = Depends(get_otp_key_service),
-    user_service: UserService = Depends(get_user_service)
+    otp_service: AsyncOtpKeyService = Depends(get_async_otp_key_service)
 ):
-    user = user_service.find_user_by_id(user_id)
+    user, otp_key = await otp_service.find_user_with_otp_key(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    otp_key = otp_service.find_otp_key_by_user_id(user_id)
     if not otp_key:
         raise HTTPException(status_code=404, detail="OTP key not found for this user")
     
-    success = otp_service.delete_otp_key(otp_key.id)
+    success = await otp_service.delete_otp_key(otp_key.id, user_id)
     if success:
         return {"message": "OTP key deleted successfully"}
     else:
@@ -1,18 +1,96 @@
-from fastapi import Depends, APIRouter, Response
-from app.schemas import UserCreate
-from app.services import UserService, get_user_service
-from app.helpers import get_redis_helper, RedisHelper
+from datetime import datetime, timezone
+from typing import List, Optional
+from fastapi import Depends, APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from app.config import USER_LIST_MAX_LIMIT, USER_EXPORT_BATCH_SIZE, SESSION_COOKIE_NAME, SESSION_COOKIE_SECURE, SESSION_MAX_AGE_SECONDS
+from app.database import AsyncSessionLocal
+from app.schemas import UserCreate, UserPage, SessionResponse
+from app.services import AsyncUserService, get_async_user_service
+from app.repositories import AsyncUserRepository
+from app.helpers.admin_helper import require_admin
+from app.helpers.password_helper import PasswordHasher, get_password_hasher
+from app.helpers.session_helper import Session, SessionStore, get_session_store, get_current_session
+from app.helpers.rate_limit_helper import RateLimiter, get_rate_limiter, client_ip, LOGIN_LIMITS
 
 user_route = APIRouter(prefix="/users", tags=["User"])
 
 @user_route.post("/sign-up")
-def Register(user: UserCreate, user_service: UserService = Depends(get_user_service)):
-    user = user_service.create_user(user)
+async def Register(user: UserCreate, user_service: AsyncUserService = Depends(get_async_user_service)):
+    user = await user_service.create_user(user)
     return Response(status_code=201)
 
 
 @user_route.post("/login")
-def Login(email: str, password: str, user_service: UserService = Depends(get_user_service), redis_helper: RedisHelper = Depends(get_redis_helper)):
-    user_service.login_user(email, password)
-    redis_helper.set(f'user:email_{email}', 'true')
+async def Login(request: Request, email: str, password: str, user_service: AsyncUserService = Depends(get_async_user_service), session_store: SessionStore = Depends(get_session_store), rate_limiter: RateLimiter = Depends(get_rate_limiter)):
+    ip = client_ip(request)
+    await rate_limiter.enforce("login", LOGIN_LIMITS, ip=ip, email=email)
+    user = await user_service.login_user(email, password)
+    token = await session_store.create(user.id, ip, request.headers.get("user-agent", ""))
+    response = Response(status_code=204)
+    response.set_cookie(
+        SESSION_COOKIE_NAME,
+        token,
+        max_age=SESSION_MAX_AGE_SECONDS,
+        httponly=True,
+        secure=SESSION_COOKIE_SECURE,
+        samesite="lax"
+    )
+    return response
+
+
+@user_route.post("/logout")
+async def Logout(session: Session = Depends(get_current_session), session_store: SessionStore = Depends(get_session_store)):
+    await session_store.revoke(session.user_id, session.id)
+    response = Response(status_code=204)
+    response.delete_cookie(SESSION_COOKIE_NAME, httponly=True, secure=SESSION_COOKIE_SECURE, samesite="lax")
+    return response
+
+
+@user_route.get("/sessions", response_model=List[SessionResponse])
+async def ListSessions(session: Session = Depends(get_current_session), session_store: SessionStore = Depends(get_session_store)):
+    return [
+        SessionResponse(
+            id=item.id,
+            created_at=datetime.fromtimestamp(item.created_at, timezone.utc),
+            last_seen_at=datetime.fromtimestamp(item.last_seen_at, timezone.utc),
+            ip=item.ip,
+            user_agent=item.user_agent,
+            current=item.id == session.id
+        )
+        for item in await session_store.list_for_user(session.user_id)
+    ]
+
+
+@user_route.delete("/sessions")
+async def RevokeOtherSessions(session: Session = Depends(get_current_session), session_store: SessionStore = Depends(get_session_store)):
+    revoked = await session_store.revoke_all(session.user_id, keep=session.id)
+    return {"revoked": revoked}
+
+
+@user_route.delete("/sessions/{session_id}")
+async def RevokeSession(session_id: str, session: Session = Depends(get_current_session), session_store: SessionStore = Depends(get_session_store)):
+    if not await session_store.revoke(session.user_id, session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
     return Response(status_code=204)
+
+
+@user_route.get("", response_model=UserPage, dependencies=[Depends(require_admin)])
+async def ListUsers(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=USER_LIST_MAX_LIMIT),
+    user_service: AsyncUserService = Depends(get_async_user_service)
+):
+    return await user_service.list_users(cursor, limit)
+
+
+@user_route.get("/export", dependencies=[Depends(require_admin)])
+async def ExportUsers(password_hasher: PasswordHasher = Depends(get_password_hasher)):
+    # The request-scoped session is closed before a streaming body is sent, so the
+    # export opens its own for as long as the stream runs.
+    async def body():
+        async with AsyncSessionLocal() as db:
+            user_service = AsyncUserService(AsyncUserRepository(db, password_hasher), password_hasher)
+            async for chunk in user_service.export_users(USER_EXPORT_BATCH_SIZE):
+                yield chunk
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
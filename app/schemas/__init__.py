@@ -1,2 +1,4 @@
 from .user_schema import *
-from .otp_schema import *
\ No newline at end of file
+from .otp_schema import *
+from .token_schema import *
+from .session_schema import *
\ No newline at end of file
@@ -1,6 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Literal, Optional
+from app.config import OTP_BATCH_MAX_SIZE
 
 
 class OtpKeyBase(BaseModel):
@@ -32,4 +33,24 @@ class OtpVerifyResponse(BaseModel):
     success: bool
     message: str
     access_token: Optional[str] = None
-    token_type: Optional[str] = "bearer"
\ No newline at end of file
+    refresh_token: Optional[str] = None
+    token_type: Optional[str] = "bearer"
+    expires_in: Optional[int] = None
+
+
+class OtpBatchCreate(BaseModel):
+    user_ids: List[int] = Field(..., min_length=1, max_length=OTP_BATCH_MAX_SIZE)
+
+
+class OtpBatchItem(BaseModel):
+    user_id: int
+    status: Literal["created", "already_enrolled", "user_not_found"]
+    id: Optional[int] = None
+    otp_key: Optional[str] = None
+    created_at: Optional[datetime] = None
+    qr_code_uri: Optional[str] = None
+
+
+class OtpBatchResponse(BaseModel):
+    created: int
+    results: List[OtpBatchItem]
@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+from datetime import datetime
+
+
+class SessionResponse(BaseModel):
+    id: str
+    created_at: datetime
+    last_seen_at: datetime
+    ip: str
+    user_agent: str
+    current: bool
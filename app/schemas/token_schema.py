@@ -0,0 +1,28 @@
+from pydantic import BaseModel, Field
+from typing import Annotated, Any, Dict, List, Optional
+from app.config import JWT_INTROSPECT_MAX_BATCH
+
+
+class TokenRefreshRequest(BaseModel):
+    refresh_token: str
+
+
+class TokenResponse(BaseModel):
+    access_token: str
+    refresh_token: Optional[str] = None
+    token_type: str = "bearer"
+    expires_in: int
+
+
+class TokenIntrospectRequest(BaseModel):
+    tokens: List[Annotated[str, Field(max_length=8192)]] = Field(..., min_length=1, max_length=JWT_INTROSPECT_MAX_BATCH)
+
+
+class TokenIntrospection(BaseModel):
+    active: bool
+    claims: Optional[Dict[str, Any]] = None
+    exp: Optional[int] = None
+
+
+class TokenIntrospectResponse(BaseModel):
+    results: List[TokenIntrospection]
@@ -1,5 +1,6 @@
-from typing import Optional
-from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, field_validator, model_validator
 
 class UserCreate(BaseModel):
     username: str
@@ -10,3 +11,41 @@ class UserUpdate(BaseModel):
     username: Optional[str] = None
     email: Optional[str] = None
     password: Optional[str] = None
+
+
+class UserResponse(BaseModel):
+    id: int
+    username: str
+    email: str
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class UserPage(BaseModel):
+    items: List[UserResponse]
+    next_cursor: Optional[str] = None
+
+
+class UserImportRecord(BaseModel):
+    username: str
+    email: str
+    password: Optional[str] = None
+    password_hash: Optional[str] = None
+
+    @field_validator('username', 'email')
+    @classmethod
+    def not_blank(cls, value: str) -> str:
+        value = value.strip()
+        if not value:
+            raise ValueError('must not be blank')
+        return value
+
+    @model_validator(mode='after')
+    def has_password(self) -> 'UserImportRecord':
+        if self.password_hash and not self.password_hash.startswith('$2'):
+            raise ValueError('password_hash must be a bcrypt hash')
+        if not self.password and not self.password_hash:
+            raise ValueError('password or password_hash is required')
+        return self
@@ -0,0 +1,97 @@
+import importlib.util
+import logging
+import os
+import random
+from dataclasses import dataclass
+from typing import Optional
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+from app import config
+from app.logging_config import configure_logging, shutdown_logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ServeOptions:
+    host: str = config.SERVER_HOST
+    port: int = config.SERVER_PORT
+    workers: int = config.SERVER_WORKERS
+    keepalive: int = config.SERVER_KEEPALIVE_SECONDS
+    backlog: int = config.SERVER_BACKLOG
+    max_requests: int = config.SERVER_LIMIT_MAX_REQUESTS
+    max_requests_jitter: int = config.SERVER_LIMIT_MAX_REQUESTS_JITTER
+    graceful_shutdown: int = config.SERVER_GRACEFUL_SHUTDOWN_SECONDS
+    access_log: bool = config.SERVER_ACCESS_LOG
+
+
+def available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def resolve_workers(workers: int) -> int:
+    return workers if workers > 0 else os.cpu_count() or 1
+
+
+class Server(uvicorn.Server):
+    # Each worker draws its own request limit, so workers started together do not
+    # all recycle at the same moment and leave the socket without listeners.
+    def __init__(self, server_config: uvicorn.Config, max_requests_jitter: int = 0):
+        super().__init__(server_config)
+        self.max_requests_jitter = max_requests_jitter
+
+    async def startup(self, sockets=None):
+        # Workers are fresh interpreters; uvicorn's own loggers go through the same
+        # queue as the app's, since serve() passes log_config=None.
+        configure_logging()
+        if self.config.limit_max_requests and self.max_requests_jitter:
+            self.config.limit_max_requests += random.randint(0, self.max_requests_jitter)
+        await super().startup(sockets=sockets)
+
+    def run(self, sockets=None):
+        # Worker processes end with os._exit, which skips atexit; flush the log
+        # queue here so the shutdown messages are written.
+        try:
+            super().run(sockets=sockets)
+        finally:
+            shutdown_logging()
+
+
+def serve(options: Optional[ServeOptions] = None):
+    # Runs the app under uvicorn: a supervisor process binds the socket once and
+    # restarts any worker that exits, which is how --max-requests recycles workers.
+    # On SIGTERM/SIGINT each worker stops accepting, waits up to graceful_shutdown
+    # seconds for in-flight requests, then runs the lifespan shutdown.
+    options = options or ServeOptions()
+    configure_logging()
+    workers = resolve_workers(options.workers)
+
+    # Every worker owns a bcrypt pool; unless configured, split the CPUs between
+    # them instead of starting CPU count hashing processes per worker.
+    if workers > 1 and "PASSWORD_HASH_WORKERS" not in os.environ:
+        os.environ["PASSWORD_HASH_WORKERS"] = str(max(1, (os.cpu_count() or 1) // workers))
+
+    server_config = uvicorn.Config(
+        "app.main:app",
+        host=options.host,
+        port=options.port,
+        workers=workers,
+        loop="uvloop" if available("uvloop") else "asyncio",
+        http="httptools" if available("httptools") else "h11",
+        timeout_keep_alive=options.keepalive,
+        backlog=options.backlog,
+        limit_max_requests=options.max_requests or None,
+        timeout_graceful_shutdown=options.graceful_shutdown,
+        access_log=options.access_log,
+        log_config=None,
+    )
+    logger.info("Serving", extra={"host": options.host, "port": options.port, "workers": workers, "loop": server_config.loop, "http": server_config.http})
+    server = Server(server_config, options.max_requests_jitter)
+
+    # A worker recycled by --max-requests exits; only the supervisor restarts it, so
+    # a single worker with a request limit still runs under one.
+    if workers == 1 and not server_config.limit_max_requests:
+        server.run()
+        return
+    sock = server_config.bind_socket()
+    Multiprocess(server_config, target=server.run, sockets=[sock]).run()
@@ -1,6 +1,9 @@
 from app.repositories import OtpKeyRepository, get_otp_key_repository
+from app.repositories import AsyncOtpKeyRepository, get_async_otp_key_repository
 from fastapi import Depends
-from app.models import OtpKey
+from app.helpers.otp_cache_helper import OtpSecretCache, get_otp_secret_cache
+from app.models import OtpKey, User
+from app.schemas import OtpBatchItem, OtpBatchResponse
 from typing import Optional
 from pyotp import TOTP
 import pyotp
@@ -35,5 +38,87 @@ class OtpKeyService:
         return totp.provisioning_uri(name=otp_key.user.email, issuer_name=issuer_name)
 
 
+class AsyncOtpKeyService:
+    def __init__(self, otp_key_repository: AsyncOtpKeyRepository, otp_secret_cache: OtpSecretCache):
+        self.otp_key_repository = otp_key_repository
+        self.otp_secret_cache = otp_secret_cache
+
+    async def create_otp_key(self, user_id: int) -> OtpKey:
+        key = pyotp.random_base32()
+        otp_key = await self.otp_key_repository.create_otp_key(key, user_id)
+        self.otp_secret_cache.created(user_id)
+        return otp_key
+
+    # Batch form of create_otp_key: one query for existing keys, one batched insert
+    # and one read-back, whatever the number of users. `emails` maps the user ids
+    # that exist to their email; ids missing from it are reported as not found.
+    async def create_otp_keys(self, user_ids: list[int], emails: dict[int, str]) -> OtpBatchResponse:
+        enrolled = await self.otp_key_repository.find_user_ids_with_otp_keys(list(emails)) if emails else set()
+        keys = {user_id: pyotp.random_base32() for user_id in user_ids if user_id in emails and user_id not in enrolled}
+
+        created = {}
+        if keys:
+            created = {otp_key.user_id: otp_key for otp_key in await self.otp_key_repository.create_otp_keys(keys)}
+            self.otp_secret_cache.created(*keys)
+
+        results = []
+        for user_id in user_ids:
+            if user_id not in emails:
+                results.append(OtpBatchItem(user_id=user_id, status="user_not_found"))
+            elif user_id not in created:
+                results.append(OtpBatchItem(user_id=user_id, status="already_enrolled"))
+            else:
+                otp_key = created[user_id]
+                results.append(OtpBatchItem(
+                    user_id=user_id,
+                    status="created",
+                    id=otp_key.id,
+                    otp_key=otp_key.otp_key,
+                    created_at=otp_key.created_at,
+                    qr_code_uri=self.provisioning_uri(otp_key, emails[user_id])
+                ))
+        return OtpBatchResponse(created=len(created), results=results)
+
+    async def find_otp_key_by_user_id(self, user_id: int) -> Optional[OtpKey]:
+        return await self.otp_key_repository.find_otp_key_by_user_id(user_id)
+
+    async def find_user_with_otp_key(self, user_id: int) -> tuple[Optional[User], Optional[OtpKey]]:
+        return await self.otp_key_repository.find_user_with_otp_key(user_id)
+
+    async def delete_otp_key(self, otp_key_id: int, user_id: int) -> bool:
+        deleted = await self.otp_key_repository.delete_otp_key(otp_key_id)
+        await self.otp_secret_cache.invalidate(user_id)
+        return deleted
+
+    async def verify_otp_code(self, user_id: int, otp_code: str) -> bool:
+        totp = await self.otp_secret_cache.get(user_id)
+        if totp is None:
+            otp_key = await self.find_otp_key_by_user_id(user_id)
+            if not otp_key:
+                return False
+            # A replica's row may predate a delete or re-enrollment; do not cache it.
+            if self.otp_key_repository.read_from_replica():
+                totp = TOTP(otp_key.otp_key)
+            else:
+                totp = await self.otp_secret_cache.set(user_id, otp_key.otp_key)
+        return totp.verify(otp_code)
+
+    async def generate_qr_code_uri(self, user_id: int, issuer_name: str = "SSO FastAPI") -> Optional[str]:
+        user, otp_key = await self.find_user_with_otp_key(user_id)
+        if not otp_key:
+            return None
+        return self.provisioning_uri(otp_key, user.email, issuer_name)
+
+    def provisioning_uri(self, otp_key: OtpKey, email: str, issuer_name: str = "SSO FastAPI") -> str:
+        return TOTP(otp_key.otp_key).provisioning_uri(name=email, issuer_name=issuer_name)
+
+
 def get_otp_key_service(otp_key_repository: OtpKeyRepository = Depends(get_otp_key_repository)):
     return OtpKeyService(otp_key_repository)
+
+
+def get_async_otp_key_service(
+    otp_key_repository: AsyncOtpKeyRepository = Depends(get_async_otp_key_repository),
+    otp_secret_cache: OtpSecretCache = Depends(get_otp_secret_cache)
+):
+    return AsyncOtpKeyService(otp_key_repository, otp_secret_cache)
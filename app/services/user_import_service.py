@@ -0,0 +1,172 @@
+import csv
+import json
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Iterator, Optional, TextIO
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from app.config import USER_IMPORT_BATCH_SIZE, USER_IMPORT_HASH_WORKERS
+from app.helpers.password_helper import hash_password
+from app.helpers.redis_helper import RedisHelper
+from app.helpers.user_cache_helper import invalidate_emails
+from app.repositories import UserRepository
+from app.schemas import UserImportRecord
+
+
+@dataclass
+class ImportCheckpoint:
+    line: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+
+    @classmethod
+    def load(cls, path: Optional[str]) -> "ImportCheckpoint":
+        if not path or not os.path.exists(path):
+            return cls()
+        with open(path) as f:
+            return cls(**json.load(f))
+
+    def save(self, path: Optional[str]):
+        if not path:
+            return
+        # Write-then-rename so a crash never leaves a half-written checkpoint.
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(asdict(self), f)
+        os.replace(f"{path}.tmp", path)
+
+
+def detect_format(filename: str) -> str:
+    return "csv" if filename.lower().endswith(".csv") else "jsonl"
+
+
+def read_records(stream: TextIO, format: str) -> Iterator[tuple[int, Optional[dict]]]:
+    # Yields (line number, record); record is None when the line cannot be parsed.
+    if format == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield line_number, record if isinstance(record, dict) else None
+
+
+class UserImportService:
+    # backend is "process" for the CLI, which owns the machine, and "thread" inside
+    # the web server: bcrypt releases the GIL, and forking a multi-threaded server
+    # process is unsafe.
+    def __init__(
+        self,
+        user_repo: UserRepository,
+        redis_helper: Optional[RedisHelper] = None,
+        batch_size: int = USER_IMPORT_BATCH_SIZE,
+        workers: int = USER_IMPORT_HASH_WORKERS,
+        backend: str = "process",
+    ):
+        if backend not in ("thread", "process"):
+            raise ValueError(f"Unknown import hash backend: {backend}")
+        self.user_repo = user_repo
+        self.redis_helper = redis_helper
+        self.batch_size = batch_size
+        self.workers = workers
+        self.backend = backend
+
+    # Yields one dict per rejected row, one per committed batch and a final summary,
+    # so callers can stream the report without holding it in memory.
+    def run(self, stream: TextIO, format: str, checkpoint: Optional[ImportCheckpoint] = None, checkpoint_path: Optional[str] = None) -> Iterator[dict]:
+        checkpoint = checkpoint or ImportCheckpoint()
+        records = ((line, record) for line, record in read_records(stream, format) if line > checkpoint.line)
+
+        executor = ProcessPoolExecutor(max_workers=self.workers) if self.backend == "process" else ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="import-bcrypt")
+        with executor:
+            while True:
+                batch = list(islice(records, self.batch_size))
+                if not batch:
+                    break
+
+                rows, issues = self._prepare(batch, executor)
+                inserted, duplicates = self._insert(rows)
+                issues.extend({"line": row["line"], "email": row["email"], "status": "duplicate"} for row in duplicates)
+                if self.redis_helper and inserted:
+                    rejected = {row["email"] for row in duplicates}
+                    invalidate_emails(self.redis_helper, [row["email"] for row in rows if row["email"] not in rejected])
+
+                checkpoint.line = batch[-1][0]
+                checkpoint.inserted += inserted
+                checkpoint.duplicates += sum(issue["status"] == "duplicate" for issue in issues)
+                checkpoint.invalid += sum(issue["status"] == "invalid" for issue in issues)
+                checkpoint.save(checkpoint_path)
+
+                yield from sorted(issues, key=lambda issue: issue["line"])
+                yield {"status": "batch", **asdict(checkpoint)}
+
+        yield {"status": "done", **asdict(checkpoint)}
+
+    def _prepare(self, batch: list[tuple[int, Optional[dict]]], executor: Executor) -> tuple[list[dict], list[dict]]:
+        issues, valid, seen = [], [], set()
+        for line, record in batch:
+            if record is None:
+                issues.append({"line": line, "status": "invalid", "detail": "unparseable record"})
+                continue
+            try:
+                user = UserImportRecord.model_validate(record)
+            except ValidationError as e:
+                issues.append({"line": line, "email": record.get("email"), "status": "invalid", "detail": e.errors(include_url=False)[0]["msg"]})
+                continue
+            if user.email in seen:
+                issues.append({"line": line, "email": user.email, "status": "duplicate"})
+                continue
+            seen.add(user.email)
+            valid.append((line, user))
+
+        existing = self.user_repo.find_existing_emails([user.email for _, user in valid]) if valid else set()
+        issues.extend({"line": line, "email": user.email, "status": "duplicate"} for line, user in valid if user.email in existing)
+        valid = [(line, user) for line, user in valid if user.email not in existing]
+
+        to_hash = [user.password.encode('utf-8') for _, user in valid if not user.password_hash]
+        chunksize = max(1, len(to_hash) // (self.workers * 4))
+        hashes = iter(list(executor.map(hash_password, to_hash, chunksize=chunksize)))
+
+        now = datetime.now(timezone.utc)
+        rows = [
+            {
+                "line": line,
+                "username": user.username,
+                "email": user.email,
+                "password": user.password_hash or next(hashes),
+                "created_at": now,
+                "updated_at": now,
+            }
+            for line, user in valid
+        ]
+        return rows, issues
+
+    def _insert(self, rows: list[dict]) -> tuple[int, list[dict]]:
+        if not rows:
+            return 0, []
+        values = [{key: value for key, value in row.items() if key != "line"} for row in rows]
+        try:
+            return self.user_repo.bulk_create_users(values), []
+        except IntegrityError:
+            self.user_repo.db.rollback()
+
+        # Someone signed up with one of these emails since the existence check;
+        # fall back to row-at-a-time so only the conflicting rows are rejected.
+        inserted, duplicates = 0, []
+        for row, value in zip(rows, values):
+            try:
+                inserted += self.user_repo.bulk_create_users([value])
+            except IntegrityError:
+                self.user_repo.db.rollback()
+                duplicates.append(row)
+        return inserted, duplicates
@@ -1,11 +1,24 @@
+import asyncio
+import logging
 from app.repositories import UserRepository, get_user_repository
-from app.schemas import UserCreate, UserUpdate
+from app.repositories import AsyncUserRepository, get_async_user_repository
+from app.schemas import UserCreate, UserUpdate, UserPage, UserResponse
+from app.helpers.password_helper import PasswordHasher, get_password_hasher
+from app.helpers.user_cache_helper import UserRecord
+from app.helpers.pagination_helper import encode_cursor, decode_cursor
+from app.config import PASSWORD_REHASH_ON_LOGIN
+from app.database import AsyncSessionLocal
 from app.models import User
 from fastapi import Depends
 from fastapi.exceptions import HTTPException
 from fastapi import status
 from bcrypt import checkpw
-from typing import Optional
+from typing import AsyncIterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Strong references to in-flight rehashes; the event loop only keeps weak ones.
+_rehash_tasks: set[asyncio.Task] = set()
 
 class UserService:
     def __init__(self, user_repo: UserRepository):
@@ -53,6 +66,99 @@ class UserService:
         
         return user
             
-    
+
+class AsyncUserService:
+    def __init__(self, user_repo: AsyncUserRepository, password_hasher: PasswordHasher):
+        self.user_repo = user_repo
+        self.password_hasher = password_hasher
+
+    async def find_user_by_id(self, user_id: int) -> Optional[UserRecord]:
+        return await self.user_repo.find_user_by_id(user_id)
+
+    async def get_user_by_id(self, user_id: int) -> UserRecord:
+        user = await self.user_repo.find_user_by_id(user_id)
+        if not user:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        return user
+
+    async def find_user_by_email(self, email: str) -> UserRecord:
+        user = await self.user_repo.find_user_by_email(email)
+        if not user:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+        return user
+
+    async def get_users(self, skip: int = 0, limit: int = 10) -> list[User]:
+        return await self.user_repo.get_users(skip, limit)
+
+    async def find_user_emails_by_ids(self, user_ids: list[int]) -> dict[int, str]:
+        return await self.user_repo.find_user_emails_by_ids(user_ids)
+
+    async def list_users(self, cursor: Optional[str], limit: int) -> UserPage:
+        # One extra row tells us whether another page exists without a COUNT.
+        rows = await self.user_repo.get_users_after(decode_cursor(cursor), limit + 1)
+        next_cursor = encode_cursor(rows[limit - 1].id) if len(rows) > limit else None
+        return UserPage(items=[UserResponse.model_validate(row) for row in rows[:limit]], next_cursor=next_cursor)
+
+    async def export_users(self, batch_size: int) -> AsyncIterator[str]:
+        async for rows in self.user_repo.stream_users(batch_size):
+            yield "".join(UserResponse.model_validate(row).model_dump_json() + "\n" for row in rows)
+
+    async def create_user(self, user: UserCreate) -> User:
+        return await self.user_repo.create_user(user)
+
+    async def update_user(self, user_id: int, user: UserUpdate) -> User:
+        user = await self.user_repo.update_user(user_id, user)
+        if not user:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+        return user
+
+    async def delete_user(self, user_id: int) -> bool:
+        return await self.user_repo.delete_user(user_id)
+
+    async def login_user(self, email: str, password: str) -> UserRecord:
+        user = await self.find_user_by_email(email)
+
+        if not await self.password_hasher.verify(password, user.password):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid password")
+
+        if PASSWORD_REHASH_ON_LOGIN and self.password_hasher.needs_rehash(user.password):
+            # Rehashes share the bounded queue with logins; while it is backed up they
+            # would push real logins into 503, so skip and rehash on a later login.
+            if self.password_hasher.has_idle_worker():
+                task = asyncio.create_task(self._rehash(user, password))
+                _rehash_tasks.add(task)
+                task.add_done_callback(_rehash_tasks.discard)
+            else:
+                self.password_hasher.metrics.skip_rehash()
+        return user
+
+    # Starts right away and runs alongside the rest of the request, which may close
+    # its session before this finishes, so use a fresh one.
+    async def _rehash(self, user: UserRecord, password: str):
+        try:
+            new_hash = await self.password_hasher.hash(password)
+            async with AsyncSessionLocal() as db:
+                repo = AsyncUserRepository(db, self.password_hasher, self.user_repo.user_cache)
+                updated = await repo.update_password_hash(user.id, user.email, user.password, new_hash)
+            self.password_hasher.metrics.rehash(updated)
+        except Exception as e:
+            self.password_hasher.metrics.rehash(False)
+            logger.warning("Password rehash failed", extra={"user_id": user.id, "error": repr(e)})
+
+
 def get_user_service(user_repo: UserRepository = Depends(get_user_repository)):
-    return UserService(user_repo)
\ No newline at end of file
+    return UserService(user_repo)
+
+
+def get_async_user_service(
+    user_repo: AsyncUserRepository = Depends(get_async_user_repository),
+    password_hasher: PasswordHasher = Depends(get_password_hasher)
+):
+    return AsyncUserService(user_repo, password_hasher)
+
+
+async def drain_rehash_tasks():
+    if _rehash_tasks:
+        await asyncio.gather(*_rehash_tasks, return_exceptions=True)
@@ -0,0 +1,171 @@
+"""Load benchmark for the hot endpoints, driven in-process over ASGI.
+
+Runs ``app.main:app`` against SQLite and fakeredis (see ``benchmarks.harness``), so it
+needs no services. Each scenario is driven at ``--concurrency`` in-flight requests and
+reports req/s and p50/p95/p99 latency. A second, shorter and sequential pass under
+``tracemalloc`` reports the peak memory a request allocates and the bytes retained
+per request (the timing pass runs without tracing).
+
+    python -m benchmarks.bench_endpoints --concurrency 50 --requests 2000 --output run.json
+    python -m benchmarks.bench_endpoints --baseline run.json --threshold 0.10
+
+With ``--baseline``, the run exits non-zero if any scenario's req/s drops, or its p99
+rises, by more than ``--threshold`` relative to the baseline file. ``login`` is bound
+by bcrypt, so it gets fewer requests (``--login-requests``); above the hasher's queue
+limit it sheds load with 503s, which are reported as ``errors``.
+
+Absolute numbers from SQLite and fakeredis are not production numbers; compare runs
+made on the same machine. ``introspect`` posts ``INTROSPECT_BATCH`` tokens per request,
+so tokens/s is req/s times the batch size.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from benchmarks.bench_db_stack import _drive, _percentile
+from benchmarks.harness import app_client, use_sqlite
+
+USER = {"username": "bench", "email": "bench@example.com", "password": "bench-password"}
+SCENARIOS = ("login", "otp_verify", "auth_me", "introspect")
+INTROSPECT_BATCH = 50
+
+
+async def _scenarios(client):
+    import pyotp
+
+    await client.post("/users/sign-up", json=USER)
+    secret = (await client.post("/otp/generate", json={"user_id": 1})).json()["otp_key"]
+    totp = pyotp.TOTP(secret)
+    token = (await client.post("/otp/verify", json={"user_id": 1, "otp_code": totp.now()})).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    # One request carries INTROSPECT_BATCH distinct tokens plus one invalid one.
+    from app.helpers.jwt_helper import JWTHelper
+    batch = [JWTHelper.create_user_token(1, f"bench{i}@example.com", "bench") for i in range(INTROSPECT_BATCH - 1)] + ["not-a-token"]
+
+    # Each call returns whether the request succeeded; failures such as the 503 the
+    # password hasher sheds under overload are counted, not raised.
+    async def login():
+        response = await client.post("/users/login", params={"email": USER["email"], "password": USER["password"]})
+        return response.status_code == 204
+
+    async def otp_verify():
+        response = await client.post("/otp/verify", json={"user_id": 1, "otp_code": totp.now()})
+        return response.status_code == 200 and response.json()["success"]
+
+    async def auth_me():
+        response = await client.get("/auth/me", headers=headers)
+        return response.status_code == 200
+
+    async def introspect():
+        response = await client.post("/auth/introspect", json={"tokens": batch})
+        return response.status_code == 200 and response.json()["results"][0]["active"]
+
+    return {"login": login, "otp_verify": otp_verify, "auth_me": auth_me, "introspect": introspect}
+
+
+async def _allocations(call, requests):
+    # peak_kib is the high-water mark of traced memory above the starting point,
+    # i.e. what one request allocates transiently; retained bytes flag leaks.
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        for _ in range(requests):
+            await call()
+        gc.collect()
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "peak_kib": round((peak - before) / 1024, 1),
+        "retained_bytes_per_request": round(max(0, after - before) / requests, 1),
+    }
+
+
+async def run(names, requests, login_requests, concurrency, alloc_requests):
+    results = []
+    async with app_client() as client:
+        calls = await _scenarios(client)
+        for name in names:
+            failures = [0]
+
+            async def call(request=calls[name]):
+                if not await request():
+                    failures[0] += 1
+
+            count = login_requests if name == "login" else requests
+            await _drive(call, min(count, concurrency * 2), concurrency)
+            failures[0] = 0
+            latencies, elapsed = await _drive(call, count, concurrency)
+            results.append({
+                "scenario": name,
+                "requests": count,
+                "errors": failures[0],
+                "concurrency": concurrency,
+                "req_per_sec": round(count / elapsed, 1),
+                "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+                "p95_ms": round(_percentile(latencies, 95) * 1000, 3),
+                "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+                **await _allocations(call, min(alloc_requests, count)),
+            })
+    return results
+
+
+def compare(results, baseline, threshold):
+    previous = {result["scenario"]: result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get(result["scenario"])
+        if before is None:
+            continue
+        if result["req_per_sec"] < before["req_per_sec"] * (1 - threshold):
+            regressions.append(f"{result['scenario']}: req/s {before['req_per_sec']} -> {result['req_per_sec']}")
+        if result["p99_ms"] > before["p99_ms"] * (1 + threshold):
+            regressions.append(f"{result['scenario']}: p99 {before['p99_ms']}ms -> {result['p99_ms']}ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--login-requests", type=int, default=200)
+    parser.add_argument("--alloc-requests", type=int, default=200, help="requests traced for allocation stats")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--baseline", help="JSON report from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative regression (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    use_sqlite()
+    # The benchmark hammers a single user; rate limiting would turn it into a 429 benchmark.
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    started = time.time()
+    results = asyncio.run(run(names, args.requests, args.login_requests, args.concurrency, args.alloc_requests))
+    report = {"started_at": started, "python": sys.version.split()[0], "results": results}
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["regressions"] = compare(results, json.load(f), args.threshold)
+
+    output = json.dumps(report, indent=2)
+    sys.stdout.write(output + "\n")
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    if report.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
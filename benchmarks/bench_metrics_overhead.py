@@ -0,0 +1,175 @@
+"""Per-request cost of metrics recording.
+
+End-to-end timings over ASGI vary by far more than the recording itself costs, so the
+budget is checked against a cost model built from direct measurements:
+
+* the fixed cost of ``MetricsMiddleware`` around a no-op ASGI app, enabled vs disabled;
+* the cost of one SQL hook pair and one histogram observation, timed in a tight loop;
+* how many of each a real request records, counted while driving the app.
+
+Budget: recording must add less than ``--budget-us`` (default 50 µs) per request; the
+run exits non-zero when a scenario goes over. End-to-end medians with recording on
+and off are reported alongside for reference.
+
+    python -m benchmarks.bench_metrics_overhead
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+from benchmarks.harness import app_client, use_sqlite
+
+
+def _per_call(func, number):
+    started = time.perf_counter()
+    for _ in range(number):
+        func()
+    return (time.perf_counter() - started) / number
+
+
+class _Counting:
+    def __init__(self):
+        from app.metrics import Counter, Histogram
+        self.targets = [(Histogram, "observe"), (Counter, "inc")]
+        self.originals = [getattr(cls, name) for cls, name in self.targets]
+        self.calls = 0
+
+    def __enter__(self):
+        for (cls, name), original in zip(self.targets, self.originals):
+            def counting(*args, _original=original, **kwargs):
+                self.calls += 1
+                return _original(*args, **kwargs)
+            setattr(cls, name, counting)
+        return self
+
+    def __exit__(self, *exc):
+        for (cls, name), original in zip(self.targets, self.originals):
+            setattr(cls, name, original)
+
+
+async def _middleware_cost(number):
+    from app.metrics import MetricsMiddleware, registry
+
+    async def noop(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200})
+
+    async def send(message):
+        pass
+
+    middleware = MetricsMiddleware(noop)
+    scope = {"type": "http", "method": "GET"}
+    with _Counting() as counting:
+        await middleware(scope, None, send)
+    costs = {}
+    for enabled in (True, False):
+        registry.enabled = enabled
+        started = time.perf_counter()
+        for _ in range(number):
+            await middleware(scope, None, send)
+        costs[enabled] = (time.perf_counter() - started) / number
+    registry.enabled = True
+    return costs[True] - costs[False], counting.calls
+
+
+def _hook_costs(number):
+    from sqlalchemy import create_engine, text
+    from app.metrics import Histogram, instrument_engine, instrumented_engines, registry
+
+    histogram = Histogram("bench_seconds", "bench", ("label",))
+    observe = _per_call(lambda: histogram.observe(0.001, "label"), number)
+
+    plain = create_engine("sqlite://")
+    instrumented = create_engine("sqlite://")
+    # Leave the registry as it was, so the bench engine's pool does not show up in
+    # the app's metrics for the rest of the run.
+    collectors = list(registry._collectors)
+    try:
+        instrument_engine(instrumented, "bench")
+        statement = text("SELECT 1")
+        with plain.connect() as plain_conn, instrumented.connect() as instrumented_conn:
+            base = _per_call(lambda: plain_conn.execute(statement), number)
+            hooked = _per_call(lambda: instrumented_conn.execute(statement), number)
+    finally:
+        registry._collectors[:] = collectors
+        instrumented_engines.pop("bench", None)
+    return observe, max(0.0, hooked - base)
+
+
+async def run(requests, rounds, number):
+    import pyotp
+    from app.database import async_engine
+    from app.metrics import registry
+    from benchmarks.harness import QueryCounter
+
+    middleware, middleware_calls = await _middleware_cost(number)
+    observe, sql_hook = _hook_costs(number)
+
+    async with app_client() as client:
+        await client.post("/users/sign-up", json={"username": "bench", "email": "bench@example.com", "password": "bench-password"})
+        secret = (await client.post("/otp/generate", json={"user_id": 1})).json()["otp_key"]
+
+        async def get_otp():
+            await client.get("/otp/1")
+
+        async def verify():
+            await client.post("/otp/verify", json={"user_id": 1, "otp_code": pyotp.TOTP(secret).now()})
+
+        results = []
+        for name, call in (("otp_get", get_otp), ("otp_verify", verify)):
+            await call()
+            with _Counting() as counting, QueryCounter(async_engine.sync_engine) as queries:
+                await call()
+            # The middleware's own observations are already in its measured cost.
+            observations = max(0, counting.calls - middleware_calls - queries.count)
+            estimate = middleware + queries.count * sql_hook + observations * observe
+
+            timings = {True: [], False: []}
+            for _ in range(rounds):
+                for enabled in (True, False):
+                    registry.enabled = enabled
+                    started = time.perf_counter()
+                    for _ in range(requests // rounds):
+                        await call()
+                    timings[enabled].append((time.perf_counter() - started) / (requests // rounds))
+            registry.enabled = True
+
+            results.append({
+                "scenario": name,
+                "sql_statements": queries.count,
+                "other_observations": observations,
+                "recording_us": round(estimate * 1e6, 2),
+                "end_to_end_us_enabled": round(statistics.median(timings[True]) * 1e6, 1),
+                "end_to_end_us_disabled": round(statistics.median(timings[False]) * 1e6, 1),
+            })
+        return {
+            "middleware_us": round(middleware * 1e6, 2),
+            "sql_hook_us": round(sql_hook * 1e6, 2),
+            "observe_us": round(observe * 1e6, 2),
+            "results": results,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--number", type=int, default=20000, help="iterations for the micro measurements")
+    parser.add_argument("--budget-us", type=float, default=50.0)
+    args = parser.parse_args(argv)
+
+    use_sqlite()
+    # Repeated verify calls for one user would otherwise be rate limited.
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    report = asyncio.run(run(args.requests, args.rounds, args.number))
+    json.dump({"budget_us": args.budget_us, **report}, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    if any(result["recording_us"] > args.budget_us for result in report["results"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Round trips saved by RedisHelper batching: sequential calls vs pipeline vs Lua.
+
+The compound operation mirrors a login request that bumps a rate-limit counter
+and touches a session (counter INCR + EXPIRE, session HSET + EXPIRE, index ZADD).
+
+    python -m benchmarks.bench_redis_pipeline --host localhost --port 6379 --iterations 2000
+
+``--fake`` runs against an in-process fakeredis server (requires ``fakeredis[lua]``);
+it has no network round trip, so it only checks that every variant runs.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from benchmarks.bench_db_stack import _percentile
+
+
+async def sequential(helper, i):
+    await helper.redis.incr(f"bench:rl:{i % 50}")
+    await helper.expire(f"bench:rl:{i % 50}", 60)
+    await helper.hset(f"bench:session:{i}", mapping={"u": i, "l": int(time.time())})
+    await helper.expire(f"bench:session:{i}", 1800)
+    await helper.zadd("bench:index", {f"bench:session:{i}": time.time()})
+
+
+async def pipelined(helper, i):
+    async with helper.pipeline(transaction=False) as pipe:
+        pipe.run_script("incr_with_ttl", [f"bench:rl:{i % 50}"], [1, 60])
+        pipe.hset(f"bench:session:{i}", mapping={"u": i, "l": int(time.time())})
+        pipe.expire(f"bench:session:{i}", 1800)
+        pipe.zadd("bench:index", {f"bench:session:{i}": time.time()})
+
+
+async def scripted(helper, i):
+    await helper.incr_with_ttl(f"bench:rl:{i % 50}", 60)
+
+
+async def run(helper, iterations):
+    results = []
+    for name, operation, round_trips in (
+        ("sequential", sequential, 5),
+        ("pipeline", pipelined, 1),
+        ("lua_incr_with_ttl", scripted, 1),
+    ):
+        latencies = []
+        started = time.perf_counter()
+        for i in range(iterations):
+            op_started = time.perf_counter()
+            await operation(helper, i)
+            latencies.append(time.perf_counter() - op_started)
+        elapsed = time.perf_counter() - started
+        results.append({
+            "variant": name,
+            "round_trips": round_trips,
+            "ops_per_sec": round(iterations / elapsed, 1),
+            "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+            "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6379)
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--fake", action="store_true", help="use an in-process fakeredis server")
+    args = parser.parse_args(argv)
+
+    from app.helpers.redis_helper import AsyncRedisHelper
+
+    async def go():
+        if args.fake:
+            import fakeredis
+            client = fakeredis.FakeAsyncRedis(decode_responses=True)
+        else:
+            import redis.asyncio as aioredis
+            client = aioredis.Redis(host=args.host, port=args.port, decode_responses=True)
+        try:
+            return await run(AsyncRedisHelper(client), args.iterations)
+        finally:
+            await client.aclose()
+
+    json.dump({"iterations": args.iterations, "results": asyncio.run(go())}, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Measure cold-start cost: import time, lifespan startup and the first request.
+
+Every run is a fresh interpreter, so nothing is shared between runs and module
+import costs are real. Each run reports:
+
+* ``import_app_ms``: ``import app`` alone, which should do no work
+* ``import_main_ms``: importing ``app.main`` (routers, models, helpers)
+* ``lifespan_ms``: engine and Redis setup, mapper configuration and pool prewarm
+* ``first_request_ms`` / ``second_request_ms``: a login for an unknown email, which
+  touches the rate limiter (Redis) and the user lookup (database)
+
+Runs with and without prewarm are interleaved, and medians are reported.
+
+    python -m benchmarks.bench_startup --sqlite --runs 5
+
+Without ``--sqlite``, the configured ``DATABASE_URL`` and Redis are used, which is
+where prewarming matters: there the first request otherwise pays for TCP and auth
+handshakes.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+async def child(use_fakes):
+    started = time.perf_counter()
+    import app  # noqa: F401
+    imported_app = time.perf_counter()
+    from app.main import app as application
+    imported_main = time.perf_counter()
+
+    import httpx
+    if use_fakes:
+        import fakeredis
+        from app.database import Base, get_engine
+        from app.redis import init_redis
+        Base.metadata.create_all(get_engine())
+        server = fakeredis.FakeServer()
+        init_redis(
+            fakeredis.FakeRedis(server=server, decode_responses=True),
+            fakeredis.FakeAsyncRedis(server=server, decode_responses=True),
+        )
+
+    transport = httpx.ASGITransport(app=application)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        lifespan_started = time.perf_counter()
+        async with application.router.lifespan_context(application):
+            lifespan_done = time.perf_counter()
+            timings = []
+            for _ in range(2):
+                request_started = time.perf_counter()
+                await client.post("/users/login", params={"email": "nobody@example.com", "password": "x"})
+                timings.append(time.perf_counter() - request_started)
+
+    return {
+        "import_app_ms": (imported_app - started) * 1000,
+        "import_main_ms": (imported_main - imported_app) * 1000,
+        "lifespan_ms": (lifespan_done - lifespan_started) * 1000,
+        "first_request_ms": timings[0] * 1000,
+        "second_request_ms": timings[1] * 1000,
+    }
+
+
+def spawn(prewarm, use_fakes):
+    env = dict(os.environ)
+    if not prewarm:
+        env.update(DB_PREWARM_CONNECTIONS="0", REDIS_PREWARM_CONNECTIONS="0")
+    if use_fakes:
+        path = os.path.join(tempfile.mkdtemp(), "startup.db")
+        env.update(DATABASE_URL=f"sqlite:///{path}", ASYNC_DATABASE_URL=f"sqlite+aiosqlite:///{path}")
+    args = [sys.executable, "-m", "benchmarks.bench_startup", "--child"] + (["--sqlite"] if use_fakes else [])
+    output = subprocess.run(args, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(runs):
+    return {key: round(statistics.median(run[key] for run in runs), 2) for key in runs[0]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--sqlite", action="store_true", help="use a throwaway SQLite database and fakeredis")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(asyncio.run(child(args.sqlite))))
+        return
+
+    results = {"prewarm": [], "no_prewarm": []}
+    for _ in range(args.runs):
+        results["prewarm"].append(spawn(True, args.sqlite))
+        results["no_prewarm"].append(spawn(False, args.sqlite))
+    json.dump({name: summarize(runs) for name, runs in results.items()}, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Compare single- and multi-worker throughput of ``python -m app serve``.
+
+For each worker count a real server is started on a local port, warmed up, then
+loaded for ``--duration`` seconds by ``--clients`` load-generator processes holding
+``--connections`` keep-alive connections in total. Reports req/s and p50/p99.
+
+    python -m benchmarks.bench_workers --workers 1,4 --duration 10 --clients 4
+
+Scenarios avoid the database and Redis, so SQLite is used and no services are
+needed: ``root`` is ``GET /`` (framework and server overhead) and ``auth_me`` is
+``GET /auth/me`` with a bearer token (JWT verification). The load generator shares
+the machine with the server, so leave it some CPUs: on a machine with N cores, the
+useful comparison is 1 worker against about N minus ``--clients`` workers.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_db_stack import _percentile
+
+SCENARIOS = ("root", "auth_me")
+
+
+def _request(path, port, token=None):
+    headers = [f"GET {path} HTTP/1.1", f"Host: 127.0.0.1:{port}"]
+    if token:
+        headers.append(f"Authorization: Bearer {token}")
+    return ("\r\n".join(headers) + "\r\n\r\n").encode("ascii")
+
+
+async def _connection(port, request, deadline, latencies, errors):
+    # A minimal HTTP/1.1 keep-alive client: the app always sends Content-Length,
+    # and a Python client this small costs far less CPU per request than httpx.
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            writer.write(request)
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n")[1:]:
+                name, _, value = line.partition(b":")
+                if name.strip().lower() == b"content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            if head[9:12] == b"200":
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors[0] += 1
+    finally:
+        writer.close()
+
+
+def _client(args):
+    port, request, connections, duration = args
+
+    async def main():
+        latencies, errors = [], [0]
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(_connection(port, request, deadline, latencies, errors) for _ in range(connections)))
+        return latencies, errors[0]
+
+    return asyncio.run(main())
+
+
+def _wait_until_up(port, process, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run(workers, path, token, duration, warmup, clients, connections):
+    port = _free_port()
+    env = dict(os.environ, SERVER_ACCESS_LOG="false", REDIS_PREWARM_CONNECTIONS="0", METRICS_ENABLED="false")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app", "serve", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_until_up(port, process)
+        request = _request(path, port, token)
+        per_client = max(1, connections // clients)
+        with multiprocessing.Pool(clients) as pool:
+            pool.map(_client, [(port, request, per_client, warmup)] * clients)
+            started = time.perf_counter()
+            results = pool.map(_client, [(port, request, per_client, duration)] * clients)
+            elapsed = time.perf_counter() - started
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=60)
+
+    latencies = [latency for client_latencies, _ in results for latency in client_latencies]
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "errors": sum(errors for _, errors in results),
+        "req_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3) if latencies else None,
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 3) if latencies else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default=f"1,{os.cpu_count() or 1}", help="comma-separated worker counts")
+    parser.add_argument("--scenario", choices=SCENARIOS, default="auth_me")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--clients", type=int, default=2, help="load-generator processes")
+    parser.add_argument("--connections", type=int, default=64, help="keep-alive connections across all clients")
+    parser.add_argument("--output", help="also write the results here as JSON")
+    args = parser.parse_args(argv)
+
+    path = os.path.join(tempfile.mkdtemp(), "workers.db")
+    os.environ.update(DATABASE_URL=f"sqlite:///{path}", ASYNC_DATABASE_URL=f"sqlite+aiosqlite:///{path}")
+
+    token = None
+    if args.scenario == "auth_me":
+        from app.helpers.jwt_helper import JWTHelper
+        token = JWTHelper.create_user_token(1, "bench@example.com", "bench")
+    target = "/auth/me" if args.scenario == "auth_me" else "/"
+
+    counts = sorted({int(count) for count in args.workers.split(",")})
+    results = [run(count, target, token, args.duration, args.warmup, args.clients, args.connections) for count in counts]
+    report = {"scenario": args.scenario, "cpus": os.cpu_count(), "clients": args.clients, "connections": args.connections, "results": results}
+    if results[0]["req_per_sec"]:
+        for result in results:
+            result["speedup"] = round(result["req_per_sec"] / results[0]["req_per_sec"], 2)
+
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
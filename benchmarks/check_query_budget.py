@@ -0,0 +1,85 @@
+"""Fail when an endpoint issues more SQL statements than its budget.
+
+Each step runs one request against the in-process harness and counts the statements
+the async engine sends. ``cold`` steps clear the in-process OTP secret cache first,
+``warm`` steps repeat a request whose lookups should come from the caches.
+
+    python -m benchmarks.check_query_budget
+
+Exits non-zero and lists the statements of every step that went over budget.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+from benchmarks.harness import QueryCounter, app_client, use_sqlite
+
+USER = {"username": "budget", "email": "budget@example.com", "password": "budget-password"}
+SECOND_USER = {"username": "budget2", "email": "budget2@example.com", "password": "budget-password"}
+ADMIN = {"X-Admin-Token": "budget-admin-token"}
+
+# (name, method, path, request kwargs, max statements)
+STEPS = [
+    ("sign_up", "POST", "/users/sign-up", {"json": USER}, 2),
+    ("login_cold", "POST", "/users/login", {"params": {"email": USER["email"], "password": USER["password"]}}, 1),
+    ("login_warm", "POST", "/users/login", {"params": {"email": USER["email"], "password": USER["password"]}}, 0),
+    ("otp_generate", "POST", "/otp/generate", {"json": {"user_id": 1}}, 3),
+    ("otp_get", "GET", "/otp/1", {}, 1),
+    ("otp_verify_cold", "POST", "/otp/verify", {"json": {"user_id": 1, "otp_code": None}}, 1),
+    ("otp_verify_warm", "POST", "/otp/verify", {"json": {"user_id": 1, "otp_code": None}}, 0),
+    ("sign_up_second", "POST", "/users/sign-up", {"json": SECOND_USER}, 2),
+    # One existing key, one new key and one unknown user: the statement count must not grow with the batch.
+    ("otp_generate_batch", "POST", "/otp/generate/batch", {"json": {"user_ids": [1, 2, 999]}, "headers": ADMIN}, 4),
+    ("otp_delete", "DELETE", "/otp/1", {}, 2),
+]
+
+
+async def run():
+    import pyotp
+    from app.database import async_engine
+    from app.helpers.otp_cache_helper import otp_totp_cache
+
+    results = []
+    secret = None
+    async with app_client() as client:
+        for name, method, path, kwargs, budget in STEPS:
+            if kwargs.get("json", {}).get("otp_code", "") is None:
+                kwargs = {"json": {**kwargs["json"], "otp_code": pyotp.TOTP(secret).now()}}
+            if name.endswith("_cold"):
+                otp_totp_cache.clear()
+            with QueryCounter(async_engine.sync_engine) as counter:
+                response = await client.request(method, path, **kwargs)
+            if name == "otp_generate":
+                secret = response.json()["otp_key"]
+            results.append({
+                "step": name,
+                "status": response.status_code,
+                "queries": counter.count,
+                "budget": budget,
+                "ok": response.status_code < 400 and counter.count <= budget,
+                "statements": counter.statements,
+            })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verbose", action="store_true", help="print the statements of every step")
+    args = parser.parse_args(argv)
+
+    use_sqlite()
+    os.environ["ADMIN_API_TOKEN"] = ADMIN["X-Admin-Token"]
+    results = asyncio.run(run())
+    for result in results:
+        if result["ok"] and not args.verbose:
+            del result["statements"]
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    if not all(result["ok"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
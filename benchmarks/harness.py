@@ -0,0 +1,65 @@
+"""In-process application harness for endpoint-level checks and benchmarks.
+
+Runs the real FastAPI app over ``httpx.ASGITransport`` against a throwaway SQLite
+database and an in-process fakeredis server, so no MySQL or Redis is needed.
+Requires ``httpx``, ``aiosqlite`` and ``fakeredis[lua]``.
+
+``use_sqlite()`` must run before anything imports ``app``: settings are read from
+the environment when ``app.config`` is imported, and the engines are built from them.
+"""
+import os
+import tempfile
+from contextlib import asynccontextmanager
+
+
+def use_sqlite() -> str:
+    path = os.path.join(tempfile.mkdtemp(), "harness.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ["ASYNC_DATABASE_URL"] = f"sqlite+aiosqlite:///{path}"
+    return path
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def __enter__(self):
+        from sqlalchemy import event
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        from sqlalchemy import event
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@asynccontextmanager
+async def app_client():
+    import fakeredis
+    import httpx
+    from app.database import Base, engine, async_engine
+    from app.main import app as application
+    from app.redis import init_redis
+    from app import models  # noqa: F401  (registers the tables on Base)
+
+    Base.metadata.create_all(engine)
+    server = fakeredis.FakeServer()
+    init_redis(
+        fakeredis.FakeRedis(server=server, decode_responses=True),
+        fakeredis.FakeAsyncRedis(server=server, decode_responses=True),
+    )
+    transport = httpx.ASGITransport(app=application)
+    try:
+        async with application.router.lifespan_context(application), httpx.AsyncClient(transport=transport, base_url="http://harness") as client:
+            yield client
+    finally:
+        await async_engine.dispose()